@@ -6,15 +6,33 @@ import json
 import os
 import re
 import subprocess
+import sys
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Tuple
-
-import requests
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
 XOPS_DIR = Path("/home/sikai/ai-workspace/x-ops")
 CAPTURE_DIR = XOPS_DIR / "data" / "captured"
 OUT_DIR = XOPS_DIR / "data" / "batch-notes"
+# The same interpreter fetch_and_learn.sh activates: the one Playwright is installed in.
+XOPS_PYTHON = XOPS_DIR / ".venv" / "bin" / "python"
+READ_SCRIPT = XOPS_DIR / "scripts" / "read_x_post.py"
+
+# read_x_post.py batch mode prints one of these lines per URL as soon as it is done.
+CAPTURED_RE = re.compile(r"^Captured (\d*) -> ")
+FAILED_RE = re.compile(r"^Failed (\S+): (.*)$")
+
+sys.path.insert(0, str(XOPS_DIR / "scripts"))
+from capture_client import daemon_available, daemon_url, submit_capture  # noqa: E402
+from capture_index import (  # noqa: E402
+    DEFAULT_TTL_HOURS,
+    connect as connect_index,
+    is_fresh,
+    load_capture,
+    set_category,
+)
+from learn_from_capture import learn_capture  # noqa: E402
+from notion_sync import MAX_CHILDREN, NotionClient, NotionPartialPageError, markdown_to_blocks  # noqa: E402
 
 CATEGORY_RULES = {
     "install-debug": ["安装", "配置", "报错", "debug", "error", "setup", "deploy", "运行", "启动"],
@@ -40,13 +58,29 @@ def load_links(path: Path) -> List[str]:
     return links
 
 
-def capture_if_needed(url: str, browser: str, proxy: str, fetch: bool) -> Path:
+def capture_if_needed(
+    url: str,
+    browser: str,
+    proxy: str,
+    fetch: bool,
+    daemon: bool = False,
+    ttl_hours: float = DEFAULT_TTL_HOURS,
+) -> Path:
     sid = extract_status_id(url)
     if not sid:
         raise ValueError(f"Invalid X link: {url}")
 
     cap = CAPTURE_DIR / f"{sid}.json"
-    if cap.exists() or not fetch:
+    if not fetch or is_fresh(sid, ttl_hours, CAPTURE_DIR):
+        return cap
+
+    if daemon and daemon_available(daemon_url()):
+        # Warm browser in the capture daemon; the learn step runs in-process on the fresh capture.
+        submit_capture(daemon_url(), url)
+        data = load_capture(sid, CAPTURE_DIR)
+        if data is None:
+            raise FileNotFoundError(f"missing capture: {cap}")
+        learn_capture(data, cap)
         return cap
 
     cmd = [str(XOPS_DIR / "scripts" / "fetch_and_learn.sh"), url, browser]
@@ -56,6 +90,83 @@ def capture_if_needed(url: str, browser: str, proxy: str, fetch: bool) -> Path:
     return cap
 
 
+def capture_pool(urls: List[str], browser: str, proxy: str, workers: int) -> Iterator[Tuple[str, str]]:
+    """Capture urls in one read_x_post.py batch run and yield (status_id, error) as each one finishes.
+
+    The batch run shares a single logged-in browser context across ``workers`` pages, so the account
+    never has more than ``workers`` statuses loading at once and the profile is opened only once.
+    """
+    if not XOPS_PYTHON.exists():
+        raise RuntimeError(f"Missing virtual env. Run setup first in {XOPS_DIR}")
+    cmd = [
+        str(XOPS_PYTHON),
+        str(READ_SCRIPT),
+        "--urls-file",
+        "-",
+        "--pool-size",
+        str(workers),
+        "--browser",
+        browser,
+        "--timeout",
+        "180000",
+    ]
+    if proxy:
+        cmd += ["--proxy", proxy]
+    proc = subprocess.Popen(
+        cmd,
+        cwd=str(XOPS_DIR),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        env={**os.environ, "PYTHONUNBUFFERED": "1"},
+    )
+    proc.stdin.write("\n".join(urls) + "\n")
+    proc.stdin.close()
+
+    tail: List[str] = []
+    for line in proc.stdout:
+        line = line.rstrip("\n")
+        tail = (tail + [line])[-20:]
+        m = CAPTURED_RE.match(line)
+        if m:
+            yield m.group(1), ""
+            continue
+        m = FAILED_RE.match(line)
+        if m:
+            yield extract_status_id(m.group(1)), m.group(2)
+    if proc.wait() != 0:
+        raise RuntimeError(f"batch capture failed rc={proc.returncode}\n" + "\n".join(tail))
+
+
+def journal_path(name: str) -> Path:
+    return OUT_DIR / f"{name}.journal.jsonl"
+
+
+def load_journal(path: Path) -> Dict[str, Dict]:
+    """Latest checkpoint per link; a line cut short by a crash is ignored."""
+    journal: Dict[str, Dict] = {}
+    if not path.exists():
+        return journal
+    for raw in path.read_text(encoding="utf-8").splitlines():
+        try:
+            entry = json.loads(raw)
+        except ValueError:
+            continue
+        if isinstance(entry, dict) and entry.get("url"):
+            journal[entry["url"]] = entry
+    return journal
+
+
+def journal_append(path: Path, url: str, state: str, **fields) -> None:
+    """Append one link state (captured, categorized, failed) to the batch checkpoint journal."""
+    entry = {"url": url, "state": state, "at": datetime.now().isoformat(), **fields}
+    with path.open("a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
 def categorize(text: str) -> str:
     low = text.lower()
     for cat, keys in CATEGORY_RULES.items():
@@ -101,57 +212,75 @@ def render_md(grouped: Dict[str, List[Dict]], total: int, name: str) -> str:
     return "\n".join(lines)
 
 
-def chunk_text(text: str, max_chars: int = 1800) -> List[str]:
-    chunks: List[str] = []
-    buf: List[str] = []
-    size = 0
-    for line in text.splitlines():
-        add = len(line) + 1
-        if size + add > max_chars and buf:
-            chunks.append("\n".join(buf))
-            buf = [line]
-            size = add
-        else:
-            buf.append(line)
-            size += add
-    if buf:
-        chunks.append("\n".join(buf))
-    return chunks
-
-
-def notion_create_page(title: str, markdown: str, token: str, db_id: str, title_prop: str) -> str:
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json",
-        "Notion-Version": "2022-06-28",
-    }
+def notion_create_page(
+    title: str,
+    blocks: List[Dict],
+    token: str,
+    db_id: str,
+    title_prop: str,
+    on_created: Optional[Callable[[str], None]] = None,
+) -> str:
+    client = NotionClient(token)
+    try:
+        return client.create_page(db_id, title_prop, title, blocks, on_created)
+    finally:
+        client.close()
+
+
+def notion_append(page_id: str, blocks: List[Dict], token: str) -> None:
+    """Append blocks to the end of an existing page (incremental batch notes push only new links)."""
+    client = NotionClient(token)
+    try:
+        client.append_blocks(page_id, blocks)
+    finally:
+        client.close()
+
+
+def state_path(name: str) -> Path:
+    return OUT_DIR / f"{name}.state.json"
+
+
+def load_state(path: Path) -> Dict:
+    """Items and Notion page of an incremental batch note; empty for a new note."""
+    if not path.exists():
+        return {"items": [], "notion_page_id": "", "unsynced": [], "pending_blocks": []}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_state(path: Path, state: Dict) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    tmp.replace(path)
 
-    children = []
-    for part in chunk_text(markdown):
-        children.append(
-            {
-                "object": "block",
-                "type": "paragraph",
-                "paragraph": {
-                    "rich_text": [{"type": "text", "text": {"content": part}}]
-                },
-            }
-        )
-
-    payload = {
-        "parent": {"database_id": db_id},
-        "properties": {
-            title_prop: {
-                "title": [{"type": "text", "text": {"content": title}}]
-            }
-        },
-        "children": children,
-    }
 
-    r = requests.post("https://api.notion.com/v1/pages", headers=headers, json=payload, timeout=40)
-    r.raise_for_status()
-    data = r.json()
-    return data.get("id", "")
+def _page_recorder(state_file: Path, items: List[Dict], blocks: List[Dict]) -> Callable[[str], None]:
+    """on_created callback that records a new page before its remaining blocks go out.
+
+    A failure or crash after that never leads the next run to create a second page; the blocks past the
+    first batch are kept as pending until an append confirms them.
+    """
+
+    def record(page_id: str) -> None:
+        state = {"items": items, "notion_page_id": page_id, "unsynced": [], "pending_blocks": blocks[MAX_CHILDREN:]}
+        save_state(state_file, state)
+
+    return record
+
+
+def render_delta_md(grouped: Dict[str, List[Dict]]) -> str:
+    """Only the newly added links, grouped by category, for appending to an existing note page."""
+    lines: List[str] = []
+    lines.append(f"## Update {datetime.now().isoformat(timespec='seconds')}")
+    lines.append("")
+    for cat, posts in grouped.items():
+        if not posts:
+            continue
+        lines.append(f"### {cat} (+{len(posts)})")
+        lines.append("")
+        for p in posts:
+            lines.append(f"- {p['status_id']} {p['url']} | {p['author']} | {p['summary']}")
+        lines.append("")
+    return "\n".join(lines)
 
 
 def main() -> None:
@@ -161,62 +290,214 @@ def main() -> None:
     parser.add_argument("--fetch", action="store_true", help="Fetch links through x-ops if capture missing")
     parser.add_argument("--browser", default="chromium")
     parser.add_argument("--proxy", default="")
+    parser.add_argument("--daemon", action="store_true", help="Capture through the running x-ops capture daemon")
+    parser.add_argument(
+        "--cache-ttl-hours",
+        type=float,
+        default=DEFAULT_TTL_HOURS,
+        help="With --fetch, recapture links older than this or with failed articles; 0 means no age limit",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="With --fetch, capture missing links N at a time in one shared browser (1 = one link at a time)",
+    )
+    parser.add_argument("--resume", default="", metavar="NAME", help="Continue batch NAME from its checkpoint journal")
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="With --resume, reprocess links the journal recorded as failed (others are reported as errors)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Keep --name as a rolling note: only links not already in it are processed and pushed",
+    )
     parser.add_argument("--notion", action="store_true", help="Sync summary to Notion")
     args = parser.parse_args()
 
+    if args.retry_failed and not args.resume:
+        parser.error("--retry-failed requires --resume NAME")
+    if args.incremental and not (args.name or args.resume):
+        parser.error("--incremental requires --name (or --resume) to identify the note")
+
     links_file = Path(args.links_file)
     links = load_links(links_file)
+    name = args.resume or args.name or datetime.now().strftime("batch_%Y%m%d_%H%M%S")
 
-    items: List[Dict] = []
-    errors: List[str] = []
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    state_file = state_path(name)
+    state = load_state(state_file) if args.incremental else {"items": [], "notion_page_id": "", "unsynced": []}
+    known_urls = {it["url"] for it in state["items"]}
+    all_links = list(dict.fromkeys([it["url"] for it in state["items"]] + links))
+    if args.incremental:
+        links = [link for link in links if link not in known_urls]
+    journal_file = journal_path(name)
+    if args.resume:
+        journal = load_journal(journal_file)
+    else:
+        journal = {}
+        journal_file.unlink(missing_ok=True)
 
-    for link in links:
+    errors: List[str] = []
+    index = connect_index()
+    # Keyed by position in the links file so the note keeps input order whatever order captures finish in.
+    items_by_pos: Dict[int, Dict] = {}
+    done: set = set()
+    # Captured in an earlier run but not categorized yet: no need to fetch again.
+    captured_before: set = set()
+
+    for pos, link in enumerate(links):
+        entry = journal.get(link)
+        if not entry:
+            continue
+        if entry["state"] == "categorized":
+            items_by_pos[pos] = entry["item"]
+            done.add(pos)
+        elif entry["state"] == "failed" and not args.retry_failed:
+            errors.append(f"{link}: {entry.get('reason', '')} (failed in an earlier run)")
+            done.add(pos)
+        elif entry["state"] == "captured":
+            captured_before.add(pos)
+
+    def _fail(pos: int, reason: str) -> None:
+        errors.append(f"{links[pos]}: {reason}")
+        journal_append(journal_file, links[pos], "failed", reason=reason)
+
+    def _collect(pos: int, link: str, data: Dict) -> None:
+        main = data.get("main", {})
+        text = main.get("text", "")
+        cat = categorize(text)
+        set_category(index, extract_status_id(link), cat)
+        items_by_pos[pos] = {
+            "status_id": data.get("target_status_id") or extract_status_id(link),
+            "url": link,
+            "author": main.get("author", ""),
+            "summary": summarize(text),
+            "category": cat,
+        }
+        journal_append(journal_file, link, "categorized", item=items_by_pos[pos])
+
+    # --workers captures through a read_x_post pool, unless a running daemon takes the captures one by one.
+    pooled = args.fetch and args.workers > 1 and not (args.daemon and daemon_available(daemon_url()))
+    if pooled:
+        stale: Dict[str, List[int]] = {}
+        for pos, link in enumerate(links):
+            if pos in done or pos in captured_before:
+                continue
+            sid = extract_status_id(link)
+            if sid and not is_fresh(sid, args.cache_ttl_hours, CAPTURE_DIR):
+                stale.setdefault(sid, []).append(pos)
+        urls = [links[positions[0]] for positions in stale.values()]
+        pool_error = ""
         try:
-            cap = capture_if_needed(link, args.browser, args.proxy, args.fetch)
+            for sid, error in capture_pool(urls, args.browser, args.proxy, args.workers):
+                positions = stale.get(sid, [])
+                done.update(positions)
+                if error:
+                    for pos in positions:
+                        _fail(pos, error)
+                    continue
+                for pos in positions:
+                    journal_append(journal_file, links[pos], "captured")
+                try:
+                    cap = CAPTURE_DIR / f"{sid}.json"
+                    data = load_capture(sid, CAPTURE_DIR)
+                    if data is None:
+                        raise FileNotFoundError(f"missing capture: {cap}")
+                    learn_capture(data, cap)
+                    for pos in positions:
+                        _collect(pos, links[pos], data)
+                except Exception as exc:
+                    for pos in positions:
+                        _fail(pos, str(exc))
+        except Exception as exc:
+            pool_error = str(exc)
+        # A run that died (or skipped a link) must not leave its links to be categorized from old captures.
+        unreported = [pos for positions in stale.values() for pos in positions if pos not in done]
+        if pool_error and not unreported:
+            errors.append(pool_error)
+        for pos in unreported:
+            done.add(pos)
+            _fail(pos, pool_error or "not reported by the batch capture run")
+
+    for pos, link in enumerate(links):
+        if pos in done:
+            continue
+        try:
+            fetch = args.fetch and not pooled and pos not in captured_before
+            cap = capture_if_needed(link, args.browser, args.proxy, fetch, args.daemon, args.cache_ttl_hours)
             if not cap.exists():
                 errors.append(f"missing capture: {link}")
+                journal_append(journal_file, link, "failed", reason="missing capture")
                 continue
+            if fetch:
+                journal_append(journal_file, link, "captured")
             data = json.loads(cap.read_text(encoding="utf-8"))
-            main = data.get("main", {})
-            text = main.get("text", "")
-            cat = categorize(text)
-            items.append(
-                {
-                    "status_id": data.get("target_status_id") or extract_status_id(link),
-                    "url": link,
-                    "author": main.get("author", ""),
-                    "summary": summarize(text),
-                    "category": cat,
-                }
-            )
+            _collect(pos, link, data)
         except Exception as exc:
-            errors.append(f"{link}: {exc}")
+            _fail(pos, str(exc))
+    index.close()
+    items = [items_by_pos[pos] for pos in sorted(items_by_pos)]
 
+    new_items = items
+    if args.incremental:
+        items = state["items"] + new_items
     grouped = build_grouped(items)
-    name = args.name or datetime.now().strftime("batch_%Y%m%d_%H%M%S")
 
-    OUT_DIR.mkdir(parents=True, exist_ok=True)
     out_md = OUT_DIR / f"{name}.md"
-    md = render_md(grouped, len(links), name)
+    md = render_md(grouped, len(all_links), name)
     out_md.write_text(md, encoding="utf-8")
 
-    notion_page_id = ""
-    if args.notion:
+    notion_page_id = state.get("notion_page_id", "")
+    # Links in the note that the Notion page does not have yet (new now, or a failed/skipped earlier push).
+    unsynced = set(state.get("unsynced", [])) | {it["url"] for it in new_items}
+    # Blocks of an earlier push that stopped part way; they go out before anything new.
+    pending_blocks = state.get("pending_blocks", [])
+    if args.notion and args.incremental and notion_page_id:
+        token = os.getenv("NOTION_TOKEN", "").strip()
+        delta = [it for it in items if it["url"] in unsynced]
+        if not token:
+            errors.append("Notion sync requested but NOTION_TOKEN missing")
+        elif delta or pending_blocks:
+            blocks = pending_blocks + (markdown_to_blocks(render_delta_md(build_grouped(delta))) if delta else [])
+            try:
+                notion_append(notion_page_id, blocks, token)
+                unsynced, pending_blocks = set(), []
+            except NotionPartialPageError as exc:
+                unsynced, pending_blocks = set(), blocks[exc.sent :]
+                errors.append(f"Notion sync incomplete: {exc}")
+    elif args.notion:
         token = os.getenv("NOTION_TOKEN", "").strip()
         db_id = os.getenv("NOTION_DATABASE_ID", "").strip()
         title_prop = os.getenv("NOTION_TITLE_PROP", "Name").strip() or "Name"
         if not token or not db_id:
             errors.append("Notion sync requested but NOTION_TOKEN or NOTION_DATABASE_ID missing")
         else:
+            blocks = markdown_to_blocks(md)
+            on_created = _page_recorder(state_file, items, blocks) if args.incremental else None
             try:
-                notion_page_id = notion_create_page(f"X Batch Learning {name}", md, token, db_id, title_prop)
+                notion_page_id = notion_create_page(
+                    f"X Batch Learning {name}", blocks, token, db_id, title_prop, on_created
+                )
+                unsynced, pending_blocks = set(), []
+            except NotionPartialPageError as exc:
+                notion_page_id = exc.page_id
+                unsynced, pending_blocks = set(), blocks[exc.sent :]
+                errors.append(f"Notion sync incomplete: {exc}")
             except Exception as exc:
                 errors.append(f"Notion sync failed: {exc}")
 
+    if args.incremental:
+        state = {"items": items, "notion_page_id": notion_page_id, "unsynced": sorted(unsynced)}
+        save_state(state_file, {**state, "pending_blocks": pending_blocks})
+
     result = {
         "links": len(links),
-        "processed": len(items),
+        "processed": len(new_items),
         "output": str(out_md),
+        "journal": str(journal_file),
         "notion_page_id": notion_page_id,
         "errors": errors,
     }
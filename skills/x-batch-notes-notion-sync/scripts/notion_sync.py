@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import re
+import time
+from typing import Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+NOTION_API = "https://api.notion.com/v1"
+NOTION_VERSION = "2022-06-28"
+
+# Notion API limits: children per create/append request, characters per rich_text item,
+# rich_text items per block.
+MAX_CHILDREN = 100
+MAX_TEXT = 2000
+MAX_RICH_TEXT = 100
+
+RETRY_STATUS = {409, 429, 500, 502, 503, 504}
+
+# Code block languages the API accepts; anything else is rejected with a validation error.
+NOTION_LANGUAGES = {
+    "abap", "arduino", "bash", "basic", "c", "clojure", "coffeescript", "c++", "c#", "css", "dart", "diff",
+    "docker", "elixir", "elm", "erlang", "flow", "fortran", "f#", "gherkin", "glsl", "go", "graphql",
+    "groovy", "haskell", "html", "java", "javascript", "json", "julia", "kotlin", "latex", "less", "lisp",
+    "livescript", "lua", "makefile", "markdown", "markup", "matlab", "mermaid", "nix", "objective-c",
+    "ocaml", "pascal", "perl", "php", "plain text", "powershell", "prolog", "protobuf", "python", "r",
+    "reason", "ruby", "rust", "sass", "scala", "scheme", "scss", "shell", "sql", "swift", "typescript",
+    "vb.net", "verilog", "vhdl", "visual basic", "webassembly", "xml", "yaml", "java/c/c++/c#",
+}
+# Common fence info strings -> Notion language names.
+LANGUAGE_ALIASES = {
+    "py": "python",
+    "python3": "python",
+    "js": "javascript",
+    "jsx": "javascript",
+    "node": "javascript",
+    "ts": "typescript",
+    "tsx": "typescript",
+    "sh": "shell",
+    "zsh": "shell",
+    "console": "shell",
+    "shell-session": "shell",
+    "ps1": "powershell",
+    "pwsh": "powershell",
+    "yml": "yaml",
+    "md": "markdown",
+    "rb": "ruby",
+    "rs": "rust",
+    "golang": "go",
+    "cpp": "c++",
+    "cc": "c++",
+    "cs": "c#",
+    "csharp": "c#",
+    "fsharp": "f#",
+    "kt": "kotlin",
+    "objc": "objective-c",
+    "dockerfile": "docker",
+    "make": "makefile",
+    "tex": "latex",
+    "proto": "protobuf",
+    "gql": "graphql",
+    "wasm": "webassembly",
+    "text": "plain text",
+    "txt": "plain text",
+    "plain": "plain text",
+    "plaintext": "plain text",
+}
+
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.*)$")
+BULLET_RE = re.compile(r"^\s*[-*]\s+(.*)$")
+NUMBERED_RE = re.compile(r"^\s*\d+[.)]\s+(.*)$")
+
+
+def _rich_text(text: str) -> List[Dict]:
+    parts = [text[i : i + MAX_TEXT] for i in range(0, len(text), MAX_TEXT)] or [""]
+    return [{"type": "text", "text": {"content": p}} for p in parts[:MAX_RICH_TEXT]]
+
+
+def _code_language(info: str) -> str:
+    lang = info.split()[0].lower() if info.strip() else ""
+    lang = LANGUAGE_ALIASES.get(lang, lang)
+    return lang if lang in NOTION_LANGUAGES else "plain text"
+
+
+def _block(kind: str, text: str, **extra) -> Dict:
+    return {"object": "block", "type": kind, kind: {"rich_text": _rich_text(text), **extra}}
+
+
+def markdown_to_blocks(markdown: str) -> List[Dict]:
+    """Map headings, bullet/numbered items, fenced code and paragraphs to native Notion blocks.
+
+    Notion has three heading levels, so ``####`` and deeper become heading_3.
+    """
+    blocks: List[Dict] = []
+    para: List[str] = []
+    code: Optional[List[str]] = None
+    code_lang = ""
+
+    def _flush_para() -> None:
+        if para:
+            blocks.append(_block("paragraph", "\n".join(para)))
+            para.clear()
+
+    for line in markdown.splitlines():
+        if code is not None:
+            if line.strip().startswith("```"):
+                blocks.append(_block("code", "\n".join(code), language=_code_language(code_lang)))
+                code = None
+            else:
+                code.append(line)
+            continue
+        if line.strip().startswith("```"):
+            _flush_para()
+            code = []
+            code_lang = line.strip()[3:].strip()
+            continue
+        if not line.strip():
+            _flush_para()
+            continue
+
+        m = HEADING_RE.match(line)
+        if m:
+            _flush_para()
+            blocks.append(_block(f"heading_{min(len(m.group(1)), 3)}", m.group(2).strip()))
+            continue
+        m = BULLET_RE.match(line)
+        if m:
+            _flush_para()
+            blocks.append(_block("bulleted_list_item", m.group(1).strip()))
+            continue
+        m = NUMBERED_RE.match(line)
+        if m:
+            _flush_para()
+            blocks.append(_block("numbered_list_item", m.group(1).strip()))
+            continue
+        para.append(line.strip())
+
+    if code is not None:
+        blocks.append(_block("code", "\n".join(code), language=_code_language(code_lang)))
+    _flush_para()
+    return blocks
+
+
+class NotionPartialPageError(RuntimeError):
+    """Appending to ``page_id`` stopped part way; the page holds only the first ``sent`` blocks given."""
+
+    def __init__(self, page_id: str, sent: int, cause: Exception) -> None:
+        super().__init__(f"page {page_id} has only the first {sent} blocks, appending the rest failed: {cause}")
+        self.page_id = page_id
+        self.sent = sent
+
+
+class NotionClient:
+    """Small Notion REST client: one pooled session, retries on 429/5xx honouring Retry-After.
+
+    ``base_url`` can point at a local stub server for testing.
+    """
+
+    def __init__(self, token: str, base_url: str = NOTION_API, retries: int = 5, timeout: int = 40) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.retries = retries
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(
+            {
+                "Authorization": f"Bearer {token}",
+                "Content-Type": "application/json",
+                "Notion-Version": NOTION_VERSION,
+            }
+        )
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _request(self, method: str, path: str, payload: Dict) -> Dict:
+        url = f"{self.base_url}{path}"
+        for attempt in range(self.retries + 1):
+            try:
+                r = self.session.request(method, url, json=payload, timeout=self.timeout)
+            except requests.ConnectionError:
+                # Not sent or not answered; a read timeout is not retried because the write may have landed.
+                if attempt == self.retries:
+                    raise
+                time.sleep(min(2 ** attempt, 30))
+                continue
+            if r.status_code in RETRY_STATUS and attempt < self.retries:
+                retry_after = r.headers.get("Retry-After", "")
+                try:
+                    delay = float(retry_after)
+                except ValueError:
+                    delay = min(2 ** attempt, 30)
+                time.sleep(delay)
+                continue
+            r.raise_for_status()
+            return r.json()
+        raise RuntimeError(f"Notion request failed after {self.retries} retries: {method} {path}")
+
+    def append_blocks(self, block_id: str, blocks: List[Dict]) -> None:
+        """Append blocks in API-sized batches, in order; a failed batch raises NotionPartialPageError."""
+        for i in range(0, len(blocks), MAX_CHILDREN):
+            try:
+                self._request("PATCH", f"/blocks/{block_id}/children", {"children": blocks[i : i + MAX_CHILDREN]})
+            except Exception as exc:
+                raise NotionPartialPageError(block_id, i, exc) from exc
+
+    def create_page(
+        self,
+        database_id: str,
+        title_prop: str,
+        title: str,
+        blocks: List[Dict],
+        on_created: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        """Create a database page with the first batch of blocks, then append the rest.
+
+        ``on_created`` gets the page id before the remaining batches are sent, so callers can record it;
+        a failed append raises NotionPartialPageError carrying the id and how many blocks the page has.
+        """
+        payload = {
+            "parent": {"database_id": database_id},
+            "properties": {title_prop: {"title": [{"type": "text", "text": {"content": title}}]}},
+            "children": blocks[:MAX_CHILDREN],
+        }
+        page_id = self._request("POST", "/pages", payload).get("id", "")
+        if not page_id:
+            return page_id
+        if on_created is not None:
+            on_created(page_id)
+        try:
+            self.append_blocks(page_id, blocks[MAX_CHILDREN:])
+        except NotionPartialPageError as exc:
+            raise NotionPartialPageError(page_id, MAX_CHILDREN + exc.sent, exc.__cause__) from exc.__cause__
+        return page_id
@@ -2,24 +2,32 @@
 from __future__ import annotations
 
 import argparse
+import contextlib
 import json
 import re
 import subprocess
 import sys
 import tempfile
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 ROOT = Path("/home/sikai/ai-workspace")
 XOPS_DIR = ROOT / "x-ops"
 CAPTURE_DIR = XOPS_DIR / "data" / "captured"
 
-READ_SCRIPT = XOPS_DIR / "scripts" / "read_x_post.py"
-LEARN_SCRIPT = XOPS_DIR / "scripts" / "learn_from_capture.py"
-TUTORIAL_SCRIPT = ROOT / "skills" / "x-tutorial-to-action" / "scripts" / "tutorial_plan.py"
-VIRAL_SCRIPT = ROOT / "skills" / "x-viral-structure-lab" / "scripts" / "viral_structure_analyzer.py"
 BATCH_SCRIPT = ROOT / "skills" / "x-batch-notes-notion-sync" / "scripts" / "batch_x_learning.py"
 
+# Single-link stages run in this process and hand the capture dict along in memory.
+sys.path.insert(0, str(XOPS_DIR / "scripts"))
+sys.path.insert(0, str(ROOT / "skills" / "x-tutorial-to-action" / "scripts"))
+sys.path.insert(0, str(ROOT / "skills" / "x-viral-structure-lab" / "scripts"))
+from capture_client import daemon_available, daemon_url, submit_capture  # noqa: E402
+from capture_index import DEFAULT_TTL_HOURS, is_fresh, load_capture  # noqa: E402
+from learn_from_capture import learn_capture  # noqa: E402
+from read_x_post import build_parser as capture_parser, capture  # noqa: E402
+from tutorial_plan import plan_capture  # noqa: E402
+from viral_structure_analyzer import analyze_capture  # noqa: E402
+
 
 def _extract_status_id(text: str) -> str:
     m = re.search(r"/status/(\d+)", text or "")
@@ -52,62 +60,62 @@ def _run(cmd: List[str], cwd: Path) -> str:
     return proc.stdout
 
 
-def _capture_single(url: str, browser: str, proxy: str, cookie_file: str, timeout_ms: int, headless: bool) -> Dict:
+def _capture_single(
+    url: str,
+    browser: str,
+    proxy: str,
+    cookie_file: str,
+    timeout_ms: int,
+    headless: bool,
+    daemon: bool = False,
+    ttl_hours: Optional[float] = None,
+) -> Dict:
     status_id = _extract_status_id(url)
     if not status_id:
         raise ValueError(f"Invalid X status URL: {url}")
 
-    output_json = CAPTURE_DIR / f"{status_id}.json"
-    cmd = [
-        sys.executable,
-        str(READ_SCRIPT),
-        url,
-        "--browser",
-        browser,
-        "--timeout",
-        str(timeout_ms),
-        "--output",
-        str(output_json),
-    ]
+    if ttl_hours is not None and is_fresh(status_id, ttl_hours, CAPTURE_DIR):
+        data = load_capture(status_id, CAPTURE_DIR)
+        if data is not None:
+            return {"status_id": status_id, "data": data, "capture_mode": "cache"}
+
+    if daemon and daemon_available(daemon_url()):
+        # The daemon's browser options were fixed at startup; only per-job settings are sent.
+        data = submit_capture(daemon_url(), url, {"timeout": timeout_ms})
+        return {"status_id": status_id, "data": data, "capture_mode": "daemon"}
+
+    argv = [url, "--browser", browser, "--timeout", str(timeout_ms), "--output-dir", str(CAPTURE_DIR)]
     if headless:
-        cmd += ["--headless"]
+        argv += ["--headless"]
     if proxy.strip():
-        cmd += ["--proxy", proxy.strip()]
+        argv += ["--proxy", proxy.strip()]
     cf = cookie_file.strip()
     if cf:
         p = Path(cf)
         if p.exists():
-            cmd += ["--cookie-file", str(p)]
-
-    try:
-        out = _run(cmd, cwd=XOPS_DIR)
-        return {"status_id": status_id, "capture_output_tail": "\n".join(out.splitlines()[-12:]), "capture_mode": "headless" if headless else "headed"}
-    except RuntimeError as exc:
-        if not headless:
-            raise
-        # Auto fallback: X occasionally returns feed error in headless mode.
-        retry_cmd = [c for c in cmd if c != "--headless"]
-        out2 = _run(retry_cmd, cwd=XOPS_DIR)
-        return {
-            "status_id": status_id,
-            "capture_output_tail": "\n".join(out2.splitlines()[-12:]),
-            "capture_mode": "headed-fallback",
-            "capture_error_headless": str(exc),
-        }
-
-
-def _learn_single(url: str) -> str:
-    cmd = [sys.executable, str(LEARN_SCRIPT), "--url", url]
-    out = _run(cmd, cwd=XOPS_DIR)
-    return "\n".join(out.splitlines()[-12:])
-
-
-def _metrics_from_capture(status_id: str) -> Dict:
-    cap = CAPTURE_DIR / f"{status_id}.json"
-    if not cap.exists():
-        return {}
-
-    data = json.loads(cap.read_text(encoding="utf-8"))
+            argv += ["--cookie-file", str(p)]
+    capture_args = capture_parser().parse_args(argv)
+
+    # Capture progress goes to stderr so stdout stays one JSON document.
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            data = capture(url, capture_args)
+            return {"status_id": status_id, "data": data, "capture_mode": "headless" if headless else "headed"}
+        except Exception as exc:
+            if not headless:
+                raise
+            # Auto fallback: X occasionally returns feed error in headless mode.
+            capture_args.headless = False
+            data = capture(url, capture_args)
+            return {
+                "status_id": status_id,
+                "data": data,
+                "capture_mode": "headed-fallback",
+                "capture_error_headless": str(exc),
+            }
+
+
+def _metrics_from_capture(data: Dict, status_id: str) -> Dict:
     main = data.get("main", {})
     article = (data.get("articles") or [{}])[0]
     return {
@@ -115,23 +123,11 @@ def _metrics_from_capture(status_id: str) -> Dict:
         "main_text_len": len(main.get("text") or ""),
         "article_status": article.get("status", ""),
         "article_text_len": len(article.get("text") or ""),
-        "capture_json": str(cap),
+        "capture_json": str(CAPTURE_DIR / f"{status_id}.json"),
         "capture_md": str(CAPTURE_DIR / f"{status_id}.md"),
     }
 
 
-def _run_tutorial(url: str) -> str:
-    cmd = [sys.executable, str(TUTORIAL_SCRIPT), "--url", url]
-    out = _run(cmd, cwd=ROOT)
-    return "\n".join(out.splitlines()[-12:])
-
-
-def _run_viral(url: str) -> str:
-    cmd = [sys.executable, str(VIRAL_SCRIPT), "--url", url]
-    out = _run(cmd, cwd=ROOT)
-    return "\n".join(out.splitlines()[-12:])
-
-
 def _run_batch(links_file: str, browser: str, proxy: str, notion: bool) -> str:
     cmd = [
         sys.executable,
@@ -169,6 +165,14 @@ def main() -> None:
     parser.add_argument("--headless", dest="headless", action="store_true", default=True)
     parser.add_argument("--headed", dest="headless", action="store_false")
     parser.add_argument("--notion", action="store_true")
+    parser.add_argument("--daemon", action="store_true", help="Capture through the running x-ops capture daemon")
+    parser.add_argument("--refresh", action="store_true", help="Always recapture, even if a fresh ok capture exists")
+    parser.add_argument(
+        "--cache-ttl-hours",
+        type=float,
+        default=DEFAULT_TTL_HOURS,
+        help="Reuse ok captures younger than this; 0 means no age limit",
+    )
     args = parser.parse_args()
 
     purpose = _normalize_purpose(args.purpose)
@@ -196,18 +200,30 @@ def main() -> None:
     if not args.url.strip():
         raise SystemExit("single-link mode requires --url")
 
-    capture_info = _capture_single(args.url, args.browser, args.proxy, args.cookie_file, args.timeout, args.headless)
-    _learn_single(args.url)
-
+    capture_info = _capture_single(
+        args.url,
+        args.browser,
+        args.proxy,
+        args.cookie_file,
+        args.timeout,
+        args.headless,
+        args.daemon,
+        None if args.refresh else args.cache_ttl_hours,
+    )
     status_id = capture_info["status_id"]
-    result["capture"] = _metrics_from_capture(status_id)
+    data = capture_info["data"]
+    capture_json = CAPTURE_DIR / f"{status_id}.json"
+    learn_capture(data, capture_json)
+    result["capture"] = _metrics_from_capture(data, status_id)
+    result["capture_mode"] = capture_info["capture_mode"]
 
+    # analysis keeps the JSON line the stage scripts print, as when they ran as subprocesses.
     if purpose == "tutorial":
-        result["analysis"] = _run_tutorial(args.url)
+        result["analysis"] = json.dumps(plan_capture(data, capture_json), ensure_ascii=False)
         result["analysis_type"] = "tutorial_plan"
         result["analysis_file"] = f"/home/sikai/ai-workspace/x-ops/data/action-plans/{status_id}.md"
     elif purpose == "viral":
-        result["analysis"] = _run_viral(args.url)
+        result["analysis"] = json.dumps(analyze_capture(data, capture_json), ensure_ascii=False)
         result["analysis_type"] = "viral_structure"
         result["analysis_file"] = f"/home/sikai/ai-workspace/x-ops/data/structure/{status_id}.md"
 
@@ -140,6 +140,21 @@ def resolve_capture(url: str, capture_path: str) -> Path:
     return p
 
 
+def plan_capture(data: Dict, capture_path: Path, output: str = "") -> Dict:
+    """Write the action plan for an in-memory capture; returns the CLI summary."""
+    texts = collect_text(data)
+    steps = extract_steps(texts)
+    commands = extract_commands(texts)
+
+    sid = data.get("target_status_id", extract_status_id(data.get("url", ""))) or "unknown"
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    out = Path(output) if output else OUT_DIR / f"{sid}.md"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(build_markdown(data, steps, commands), encoding="utf-8")
+
+    return {"capture": str(capture_path), "output": str(out), "steps": len(steps), "commands": len(commands)}
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Build execution plan from captured X tutorial")
     parser.add_argument("--url", default="", help="X URL to infer capture file")
@@ -150,17 +165,7 @@ def main() -> None:
     cap = resolve_capture(args.url, args.capture)
     data = json.loads(cap.read_text(encoding="utf-8"))
 
-    texts = collect_text(data)
-    steps = extract_steps(texts)
-    commands = extract_commands(texts)
-
-    sid = data.get("target_status_id", extract_status_id(data.get("url", ""))) or "unknown"
-    OUT_DIR.mkdir(parents=True, exist_ok=True)
-    out = Path(args.output) if args.output else OUT_DIR / f"{sid}.md"
-    out.parent.mkdir(parents=True, exist_ok=True)
-    out.write_text(build_markdown(data, steps, commands), encoding="utf-8")
-
-    print(json.dumps({"capture": str(cap), "output": str(out), "steps": len(steps), "commands": len(commands)}, ensure_ascii=False))
+    print(json.dumps(plan_capture(data, cap, args.output), ensure_ascii=False))
 
 
 if __name__ == "__main__":
@@ -129,6 +129,20 @@ def resolve_capture(url: str, capture_path: str) -> Path:
     return p
 
 
+def analyze_capture(data: Dict, capture_path: Path, output: str = "") -> Dict:
+    """Write the structure report for an in-memory capture; returns the CLI summary."""
+    rep = build_report(data)
+
+    sid = rep.get("target_status_id") or extract_status_id(rep.get("url", "")) or "unknown"
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    base = Path(output) if output else (OUT_DIR / sid)
+
+    (base.with_suffix(".json")).write_text(json.dumps(rep, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    (base.with_suffix(".md")).write_text(render_md(rep), encoding="utf-8")
+
+    return {"capture": str(capture_path), "out_json": str(base.with_suffix(".json")), "out_md": str(base.with_suffix(".md"))}
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Analyze captured X post for viral structure")
     parser.add_argument("--url", default="", help="X URL to infer capture file")
@@ -138,16 +152,7 @@ def main() -> None:
 
     cap = resolve_capture(args.url, args.capture)
     data = json.loads(cap.read_text(encoding="utf-8"))
-    rep = build_report(data)
-
-    sid = rep.get("target_status_id") or extract_status_id(rep.get("url", "")) or "unknown"
-    OUT_DIR.mkdir(parents=True, exist_ok=True)
-    base = Path(args.output) if args.output else (OUT_DIR / sid)
-
-    (base.with_suffix(".json")).write_text(json.dumps(rep, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
-    (base.with_suffix(".md")).write_text(render_md(rep), encoding="utf-8")
-
-    print(json.dumps({"capture": str(cap), "out_json": str(base.with_suffix('.json')), "out_md": str(base.with_suffix('.md'))}, ensure_ascii=False))
+    print(json.dumps(analyze_capture(data, cap, args.output), ensure_ascii=False))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import json
+import os
+import urllib.error
+import urllib.request
+from typing import Dict, Optional
+
+DEFAULT_DAEMON_URL = "http://127.0.0.1:8765"
+
+# read_x_post options a client may set per job; browser/profile/proxy and where captures and media are
+# written (--output-dir/--media-dir) are fixed when the daemon starts.
+JOB_OPTIONS = (
+    "timeout",
+    "backend",
+    "scrolls",
+    "scroll_wait_ms",
+    "max_articles",
+    "max_thread",
+    "article_pages",
+    "article_timeout",
+    "include_others",
+    "download_media",
+    "media_workers",
+)
+
+
+def daemon_url(url: str = "") -> str:
+    return (url.strip() or os.getenv("X_CAPTURE_DAEMON", "").strip() or DEFAULT_DAEMON_URL).rstrip("/")
+
+
+def daemon_available(base_url: str, timeout: float = 1.0) -> bool:
+    try:
+        with urllib.request.urlopen(f"{base_url}/health", timeout=timeout) as resp:
+            return resp.status == 200
+    except Exception:
+        return False
+
+
+def job_options(args) -> Dict:
+    return {k: getattr(args, k) for k in JOB_OPTIONS if hasattr(args, k)}
+
+
+def submit_capture(base_url: str, url: str, options: Optional[Dict] = None, timeout: float = 600) -> Dict:
+    """Run one capture on the daemon's warm browser context and return the capture JSON."""
+    body = json.dumps({"url": url, "options": options or {}}).encode("utf-8")
+    req = urllib.request.Request(
+        f"{base_url}/capture",
+        data=body,
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+    except urllib.error.HTTPError as exc:
+        try:
+            detail = json.loads(exc.read().decode("utf-8")).get("error", "")
+        except Exception:
+            detail = ""
+        raise RuntimeError(f"Daemon capture failed ({exc.code}): {detail or exc.reason}") from exc
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+from playwright.sync_api import sync_playwright
+
+import read_x_post
+from capture_client import JOB_OPTIONS
+
+
+# choices= of the read_x_post options, so job values are held to the same set as the CLI.
+OPTION_CHOICES = {a.dest: a.choices for a in read_x_post.build_parser()._actions if a.choices}
+
+
+def _job_args(base: argparse.Namespace, options: Dict) -> argparse.Namespace:
+    """Daemon args with a job's options applied; raises ValueError for a value the CLI would reject."""
+    args = argparse.Namespace(**vars(base))
+    for key in JOB_OPTIONS:
+        if key not in options or options[key] is None:
+            continue
+        default = getattr(base, key)
+        value = options[key]
+        # Same type as the CLI option; no truthiness or int() coercion of strings like "false".
+        if isinstance(default, bool):
+            ok = isinstance(value, bool)
+        elif isinstance(default, int):
+            ok = isinstance(value, int) and not isinstance(value, bool)
+        else:
+            ok = isinstance(value, str)
+        if not ok:
+            raise ValueError(f"option {key} must be {type(default).__name__}, got {value!r}")
+        choices = OPTION_CHOICES.get(key)
+        if choices and value not in choices:
+            raise ValueError(f"option {key} must be one of {', '.join(map(str, choices))}, got {value!r}")
+        setattr(args, key, value)
+    return args
+
+
+class CaptureJob:
+    def __init__(self, url: str, args: argparse.Namespace) -> None:
+        self.url = url
+        self.args = args
+        self.done = threading.Event()
+        self.result: Optional[Dict] = None
+        self.error: Optional[Exception] = None
+
+
+class CaptureServer(ThreadingHTTPServer):
+    """HTTP is served on worker threads; captures are queued to the thread that started Playwright.
+
+    Playwright's sync API must stay on that thread, so ``run_jobs`` executes one job at a time there
+    while /health keeps answering.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], playwright, args: argparse.Namespace) -> None:
+        super().__init__(address, CaptureHandler)
+        self.playwright = playwright
+        self.args = args
+        self.context = read_x_post._launch_context(playwright, args)
+        self.stopping = threading.Event()
+        self.pending: "queue.Queue[CaptureJob]" = queue.Queue()
+        self.busy = False
+        self.jobs = 0
+
+    def relaunch(self) -> None:
+        try:
+            self.context.close()
+        except Exception:
+            pass
+        self.context = read_x_post._launch_context(self.playwright, self.args)
+
+    def capture(self, url: str, job_args: argparse.Namespace) -> Dict:
+        try:
+            return read_x_post.capture_url(self.context, url, job_args)
+        except Exception as exc:
+            if "closed" not in str(exc).lower():
+                raise
+            # Browser crashed or was closed by hand: relaunch once and retry.
+            self.relaunch()
+            return read_x_post.capture_url(self.context, url, job_args)
+
+    def submit(self, url: str, job_args: argparse.Namespace) -> CaptureJob:
+        job = CaptureJob(url, job_args)
+        self.pending.put(job)
+        return job
+
+    def run_jobs(self) -> None:
+        """Run queued captures on the calling (Playwright) thread until shutdown is requested."""
+        while not self.stopping.is_set():
+            try:
+                job = self.pending.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self.busy = True
+            try:
+                job.result = self.capture(job.url, job.args)
+            except Exception as exc:
+                job.error = exc
+            finally:
+                self.busy = False
+                self.jobs += 1
+                job.done.set()
+        while True:
+            try:
+                job = self.pending.get_nowait()
+            except queue.Empty:
+                break
+            job.error = RuntimeError("capture daemon is shutting down")
+            job.done.set()
+
+
+class CaptureHandler(BaseHTTPRequestHandler):
+    server: CaptureServer
+
+    def _send_json(self, code: int, payload: Dict) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _cross_origin(self) -> bool:
+        """Browsers add Origin to requests a web page makes; the daemon only serves local clients."""
+        if not self.headers.get("Origin"):
+            return False
+        self._send_json(403, {"error": "cross-origin requests are not accepted"})
+        return True
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        data = json.loads(self.rfile.read(length).decode("utf-8"))
+        if not isinstance(data, dict):
+            raise ValueError("JSON body must be an object")
+        return data
+
+    def do_GET(self) -> None:
+        if self._cross_origin():
+            return
+        if urlparse(self.path).path == "/health":
+            self._send_json(
+                200,
+                {
+                    "ok": True,
+                    "pid": os.getpid(),
+                    "jobs": self.server.jobs,
+                    "busy": self.server.busy,
+                    "queued": self.server.pending.qsize(),
+                },
+            )
+            return
+        self._send_json(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        if self._cross_origin():
+            return
+        # A web page can only send application/json after a CORS preflight, which the daemon never grants.
+        content_type = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        if content_type != "application/json":
+            self._send_json(415, {"error": "Content-Type must be application/json"})
+            return
+        path = urlparse(self.path).path
+        if path == "/shutdown":
+            self.server.stopping.set()
+            self._send_json(200, {"ok": True})
+            return
+        if path != "/capture":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        try:
+            job = self._read_json()
+        except Exception:
+            self._send_json(400, {"error": "invalid JSON body"})
+            return
+        url = (job.get("url") or "").strip()
+        if not read_x_post._extract_status_id(url):
+            self._send_json(400, {"error": f"not an X status URL: {url}"})
+            return
+
+        options = job.get("options") or {}
+        if not isinstance(options, dict):
+            self._send_json(400, {"error": "options must be an object"})
+            return
+        try:
+            job_args = _job_args(self.server.args, options)
+        except ValueError as exc:
+            self._send_json(400, {"error": str(exc)})
+            return
+        pending = self.server.submit(url, job_args)
+        pending.done.wait()
+        try:
+            if pending.error is not None:
+                raise pending.error
+            result = pending.result or {}
+        except read_x_post.NotLoggedInError as exc:
+            self._send_json(401, {"error": str(exc)})
+            return
+        except PlaywrightTimeoutError as exc:
+            self._send_json(504, {"error": f"Timed out loading X post: {exc}"})
+            return
+        except Exception as exc:
+            self._send_json(500, {"error": str(exc) or type(exc).__name__})
+            return
+        self._send_json(200, result)
+
+    def log_message(self, fmt: str, *args) -> None:
+        print(f"[capture-daemon] {self.address_string()} {fmt % args}")
+
+
+def main() -> None:
+    parser = read_x_post.build_parser()
+    parser.description = "Keep a logged-in X browser context warm and serve capture jobs on localhost"
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    if args.url or args.urls_file:
+        parser.error("the daemon takes capture URLs over HTTP, not on the command line")
+
+    with sync_playwright() as p:
+        server = CaptureServer((args.host, args.port), p, args)
+        if args.manual_login and not args.headless:
+            login_page = server.context.new_page()
+            read_x_post._manual_login(login_page, args.timeout)
+            login_page.close()
+        print(f"Capture daemon listening on http://{args.host}:{args.port} (POST /capture, GET /health, POST /shutdown)")
+        http_thread = threading.Thread(target=server.serve_forever, daemon=True)
+        http_thread.start()
+        try:
+            server.run_jobs()
+        except KeyboardInterrupt:
+            server.stopping.set()
+        finally:
+            server.shutdown()
+            server.server_close()
+            try:
+                server.context.close()
+            except Exception:
+                pass
+
+
+if __name__ == "__main__":
+    main()
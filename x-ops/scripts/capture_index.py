@@ -0,0 +1,366 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_DIR = ROOT / "data"
+CAPTURE_DIR = DATA_DIR / "captured"
+DB_PATH = DATA_DIR / "capture_index.sqlite"
+
+# Freshness policy shared by read_x_post --skip-fresh, batch runs and the dispatcher.
+# 0 disables the age check; captures are then only refreshed when not complete.
+DEFAULT_TTL_HOURS = float(os.getenv("X_CAPTURE_TTL_HOURS", "24") or 0)
+OK_ARTICLE_STATUSES = {"ok", "from_status_page"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS captures (
+    status_id TEXT PRIMARY KEY,
+    url TEXT NOT NULL DEFAULT '',
+    author TEXT NOT NULL DEFAULT '',
+    author_handle TEXT NOT NULL DEFAULT '',
+    posted_at TEXT NOT NULL DEFAULT '',
+    captured_at TEXT NOT NULL DEFAULT '',
+    json_path TEXT NOT NULL DEFAULT '',
+    thread_count INTEGER NOT NULL DEFAULT 0,
+    article_count INTEGER NOT NULL DEFAULT 0,
+    article_status TEXT NOT NULL DEFAULT '',
+    category TEXT NOT NULL DEFAULT '',
+    complete INTEGER
+);
+CREATE INDEX IF NOT EXISTS captures_author ON captures (author_handle);
+CREATE INDEX IF NOT EXISTS captures_posted ON captures (posted_at);
+CREATE INDEX IF NOT EXISTS captures_category ON captures (category);
+CREATE INDEX IF NOT EXISTS captures_article_status ON captures (article_status);
+"""
+
+# trigram (SQLite 3.34+) gives substring matches for Chinese text, which unicode61 does not segment.
+FTS_SCHEMAS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS captures_fts USING fts5 (status_id UNINDEXED, body, tokenize='trigram');",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS captures_fts USING fts5 (status_id UNINDEXED, body);",
+)
+FTS_MIN_CHARS = 3
+
+SUMMARY_COLUMNS = (
+    "status_id",
+    "url",
+    "author",
+    "author_handle",
+    "posted_at",
+    "captured_at",
+    "json_path",
+    "thread_count",
+    "article_count",
+    "article_status",
+    "category",
+    "complete",
+)
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """Bring indexes created by earlier versions up to SCHEMA."""
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(captures)")}
+    if "complete" not in columns:
+        # NULL = unknown; is_fresh backfills it from the JSON file on first use.
+        with conn:
+            conn.execute("ALTER TABLE captures ADD COLUMN complete INTEGER")
+    if "payload" not in columns:
+        return
+    try:
+        with conn:
+            conn.execute("ALTER TABLE captures DROP COLUMN payload")
+    except sqlite3.OperationalError:
+        # SQLite < 3.35: the index is derived data, so start over; `rebuild` refills it from the JSON files.
+        with conn:
+            conn.execute("DROP TABLE captures")
+            conn.execute("DROP TABLE IF EXISTS captures_fts")
+        conn.executescript(SCHEMA)
+        print("Capture index schema changed; run `capture_index.py rebuild` to re-index existing captures.")
+
+
+def connect(db_path: Path = DB_PATH) -> sqlite3.Connection:
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    _migrate(conn)
+    for schema in FTS_SCHEMAS:
+        try:
+            conn.executescript(schema)
+            break
+        except sqlite3.OperationalError:
+            # No trigram tokenizer (plain fts5 next), or no FTS5 at all (text search unavailable).
+            continue
+    return conn
+
+
+def _has_fts(conn: sqlite3.Connection) -> bool:
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'captures_fts'").fetchone()
+    return row is not None
+
+
+def _body_text(result: Dict) -> str:
+    parts = [result.get("main", {}).get("text", "")]
+    parts.extend(item.get("text", "") for item in result.get("thread", []))
+    parts.extend(item.get("title", "") + "\n" + item.get("text", "") for item in result.get("articles", []))
+    return "\n".join(p for p in parts if p and p.strip())
+
+
+def _article_status(result: Dict) -> str:
+    # First article drives the summary, matching check_capture.sh and the dispatcher metrics.
+    articles = result.get("articles") or []
+    return articles[0].get("status", "") if articles else ""
+
+
+def capture_ok(result: Dict) -> bool:
+    """A capture is complete when every linked long-form article was read."""
+    return all(a.get("status") in OK_ARTICLE_STATUSES for a in result.get("articles", []))
+
+
+def upsert(conn: sqlite3.Connection, result: Dict, json_path: Path) -> None:
+    sid = result.get("target_status_id", "")
+    if not sid:
+        return
+    main = result.get("main", {})
+    with conn:
+        conn.execute(
+            """
+            INSERT INTO captures (
+                status_id, url, author, author_handle, posted_at, captured_at, json_path,
+                thread_count, article_count, article_status, complete
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (status_id) DO UPDATE SET
+                url = excluded.url,
+                author = excluded.author,
+                author_handle = excluded.author_handle,
+                posted_at = excluded.posted_at,
+                captured_at = excluded.captured_at,
+                json_path = excluded.json_path,
+                thread_count = excluded.thread_count,
+                article_count = excluded.article_count,
+                article_status = excluded.article_status,
+                complete = excluded.complete
+            """,
+            (
+                sid,
+                result.get("url", ""),
+                main.get("author", ""),
+                (main.get("author_handle") or "").lower(),
+                main.get("timestamp", ""),
+                result.get("captured_at", ""),
+                str(json_path),
+                len(result.get("thread", [])),
+                len(result.get("articles", [])),
+                _article_status(result),
+                int(capture_ok(result)),
+            ),
+        )
+        if _has_fts(conn):
+            conn.execute("DELETE FROM captures_fts WHERE status_id = ?", (sid,))
+            conn.execute("INSERT INTO captures_fts (status_id, body) VALUES (?, ?)", (sid, _body_text(result)))
+
+
+def set_category(conn: sqlite3.Connection, status_id: str, category: str) -> None:
+    with conn:
+        conn.execute("UPDATE captures SET category = ? WHERE status_id = ?", (category, status_id))
+
+
+def get(conn: sqlite3.Connection, status_id: str) -> Optional[Dict]:
+    """Summary row for one capture; the capture itself is read with load_capture."""
+    columns = ", ".join(SUMMARY_COLUMNS)
+    row = conn.execute(f"SELECT {columns} FROM captures WHERE status_id = ?", (status_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def query(
+    conn: sqlite3.Connection,
+    author: str = "",
+    since: str = "",
+    until: str = "",
+    category: str = "",
+    article_status: str = "",
+    text: str = "",
+    limit: int = 50,
+) -> List[Dict]:
+    """Summary rows matching every given filter, newest post first."""
+    where: List[str] = []
+    params: List[object] = []
+    if author:
+        where.append("c.author_handle = ?")
+        params.append(author.lstrip("@").lower())
+    if since:
+        where.append("c.posted_at >= ?")
+        params.append(since)
+    if until:
+        where.append("c.posted_at < ?")
+        params.append(until)
+    if category:
+        where.append("c.category = ?")
+        params.append(category)
+    if article_status:
+        where.append("c.article_status = ?")
+        params.append(article_status)
+    joins = ""
+    if text:
+        if not _has_fts(conn):
+            raise RuntimeError("Text search needs SQLite with FTS5")
+        joins = "JOIN captures_fts f ON f.status_id = c.status_id"
+        if len(text) >= FTS_MIN_CHARS:
+            where.append("captures_fts MATCH ?")
+            # One quoted phrase, so punctuation in the search text is not parsed as FTS syntax.
+            params.append('"' + text.replace('"', '""') + '"')
+        else:
+            # Too short for trigrams: scan the indexed text. A bare `f.body LIKE` is handed to the trigram
+            # index, which matches nothing under 3 characters (e.g. 2-character Chinese terms); the
+            # concatenation keeps the planner from doing that.
+            where.append("(f.body || '') LIKE ? ESCAPE '\\'")
+            escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(f"%{escaped}%")
+
+    columns = ", ".join(f"c.{col}" for col in SUMMARY_COLUMNS)
+    sql = f"SELECT {columns} FROM captures c {joins}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY c.posted_at DESC LIMIT ?"
+    params.append(limit)
+    return [dict(row) for row in conn.execute(sql, params)]
+
+
+def rebuild(conn: sqlite3.Connection, capture_dir: Path = CAPTURE_DIR) -> int:
+    """Index every <status_id>.json under capture_dir; for captures written before the index existed."""
+    count = 0
+    for path in sorted(Path(capture_dir).glob("*.json")):
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            continue
+        if not isinstance(data, dict) or not data.get("target_status_id"):
+            continue
+        upsert(conn, data, path)
+        count += 1
+    return count
+
+
+def index_capture(result: Dict, json_path: Path, db_path: Path = DB_PATH) -> None:
+    """Open, upsert, close: for writers that index one capture at a time."""
+    conn = connect(db_path)
+    try:
+        upsert(conn, result, json_path)
+    finally:
+        conn.close()
+
+
+def load_capture(status_id: str, capture_dir: Path = CAPTURE_DIR, db_path: Path = DB_PATH) -> Optional[Dict]:
+    """Capture dict for a status id, read from its JSON file (the source of truth).
+
+    <capture_dir>/<sid>.json first; the index only supplies the path of captures written elsewhere.
+    """
+    path = Path(capture_dir) / f"{status_id}.json"
+    if not path.exists() and Path(db_path).exists():
+        try:
+            conn = connect(db_path)
+            try:
+                row = get(conn, status_id)
+            finally:
+                conn.close()
+            if row and row.get("json_path"):
+                path = Path(row["json_path"])
+        except sqlite3.Error:
+            pass
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def is_fresh(
+    status_id: str,
+    ttl_hours: float = DEFAULT_TTL_HOURS,
+    capture_dir: Path = CAPTURE_DIR,
+    db_path: Path = DB_PATH,
+) -> bool:
+    """True when <sid>.json exists, every article status was ok, and it is younger than ttl_hours."""
+    path = Path(capture_dir) / f"{status_id}.json"
+    if not status_id or not path.exists():
+        return False
+    try:
+        conn = connect(db_path)
+        try:
+            row = get(conn, status_id)
+            if row is None or row.get("complete") is None:
+                # Captured before it was indexed (or before `complete` existed): read once and backfill.
+                upsert(conn, json.loads(path.read_text(encoding="utf-8")), path)
+                row = get(conn, status_id)
+        finally:
+            conn.close()
+    except (sqlite3.Error, ValueError):
+        return False
+    if not row or not row.get("complete"):
+        return False
+    if ttl_hours <= 0:
+        return True
+    try:
+        captured_at = datetime.fromisoformat(row.get("captured_at", ""))
+    except ValueError:
+        return False
+    if captured_at.tzinfo is None:
+        captured_at = captured_at.replace(tzinfo=timezone.utc)
+    age_hours = (datetime.now(timezone.utc) - captured_at).total_seconds() / 3600
+    return age_hours < ttl_hours
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Query or rebuild the SQLite index of captured X posts")
+    parser.add_argument("--db", default=str(DB_PATH), help="Index database path")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_rebuild = sub.add_parser("rebuild", help="Index all capture JSON files")
+    p_rebuild.add_argument("--capture-dir", default=str(CAPTURE_DIR))
+
+    p_get = sub.add_parser("get", help="Print one capture JSON")
+    p_get.add_argument("status_id")
+
+    p_query = sub.add_parser("query", help="List captures matching filters")
+    p_query.add_argument("--author", default="", help="Author handle, with or without @")
+    p_query.add_argument("--since", default="", help="Posted at or after (ISO date/time)")
+    p_query.add_argument("--until", default="", help="Posted before (ISO date/time)")
+    p_query.add_argument("--category", default="")
+    p_query.add_argument("--article-status", default="", help="e.g. ok, login_required, access_limited")
+    p_query.add_argument("--text", default="", help="Full-text search over post, thread and article text")
+    p_query.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    conn = connect(Path(args.db))
+    try:
+        if args.command == "rebuild":
+            count = rebuild(conn, Path(args.capture_dir))
+            print(json.dumps({"indexed": count, "db": args.db}, ensure_ascii=False))
+        elif args.command == "get":
+            data = load_capture(args.status_id, db_path=Path(args.db))
+            if data is None:
+                raise SystemExit(f"No capture for: {args.status_id}")
+            print(json.dumps(data, ensure_ascii=False, indent=2))
+        else:
+            rows = query(
+                conn,
+                author=args.author,
+                since=args.since,
+                until=args.until,
+                category=args.category,
+                article_status=args.article_status,
+                text=args.text,
+                limit=args.limit,
+            )
+            print(json.dumps(rows, ensure_ascii=False, indent=2))
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,76 +2,73 @@ from __future__ import annotations
 
 import argparse
 import re
-import time
 from pathlib import Path
-from typing import List
 
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
 
-from queue_io import QueueItem, parse_queue_md, write_queue_md
+import x_rate_limit
+from queue_io import QueueItem, append_status, parse_queue_md, write_queue_md
 
 ROOT = Path(__file__).resolve().parents[1]
 DATA_DIR = ROOT / "data"
 PROFILE_DIR = DATA_DIR / "profile"
 
 
-def click_first(page, selectors: List[str], timeout: int = 2000) -> bool:
-    for sel in selectors:
-        try:
-            locator = page.locator(sel)
-            if locator.count() > 0:
-                locator.first.click(timeout=timeout)
-                return True
-        except Exception:
-            continue
-    return False
-
-
-def click_by_role(page, names: List[str], timeout: int = 2000) -> bool:
-    for name in names:
-        try:
-            button = page.get_by_role("button", name=re.compile(name))
-            if button.count() > 0:
-                button.first.click(timeout=timeout)
-                return True
-        except Exception:
-            continue
-    return False
+HOME_URL = "https://x.com/home"
+COMPOSE_BUTTON = 'a[data-testid="SideNav_NewTweet_Button"]'
+# The home timeline has its own inline textbox; the composer is the one inside the modal dialog.
+COMPOSER_TEXTBOX = 'div[role="dialog"] div[role="textbox"]'
+# Scoped to the dialog so a close button elsewhere on the page (e.g. a sheet or banner) is never hit.
+CLOSE_BUTTONS = ", ".join(
+    f'div[role="dialog"] {sel}'
+    for sel in [
+        'button[data-testid="AppTabBar_Close_Button"]',
+        'button[data-testid="app-bar-close"]',
+        'button[aria-label="Close"]',
+        'button[aria-label="关闭"]',
+    ]
+)
+CONFIRM_BUTTONS = 'button[data-testid="confirmationSheetConfirm"], button[data-testid="confirm"]'
+SAVE_NAME_RE = re.compile(r"^\s*(Save|保存)\s*$")
 
 
 def open_compose(page) -> None:
-    page.goto("https://x.com/compose/tweet", wait_until="domcontentloaded")
-    page.wait_for_selector('div[role="textbox"]', timeout=20000)
+    """Open the composer modal from the loaded app; only (re)load x.com when the app isn't usable."""
+    # Every draft saved is an account action, so each item is paced whether or not the page reloads.
+    x_rate_limit.acquire()
+    button = page.locator(COMPOSE_BUTTON).first
+    if page.locator(COMPOSER_TEXTBOX).count() > 0 or not button.is_visible():
+        # First item, or a previous item failed with its dialog still open.
+        page.goto(HOME_URL, wait_until="domcontentloaded")
+        button.wait_for(state="visible", timeout=20000)
+    button.click()
+    page.locator(COMPOSER_TEXTBOX).first.wait_for(state="visible", timeout=20000)
 
 
 def fill_text(page, text: str) -> None:
-    textbox = page.locator('div[role="textbox"]')
-    textbox.first.click()
+    textbox = page.locator(COMPOSER_TEXTBOX).first
+    textbox.click()
     try:
-        textbox.first.fill(text)
+        textbox.fill(text)
     except Exception:
-        textbox.first.type(text, delay=10)
+        textbox.type(text, delay=10)
+    # Wait until the editor shows the text, so closing the dialog offers to save it.
+    probe = text.strip().splitlines()[0][:20] if text.strip() else ""
+    if probe:
+        page.locator(COMPOSER_TEXTBOX).filter(has_text=probe).first.wait_for(timeout=5000)
 
 
 def save_draft(page) -> None:
-    close_selectors = [
-        'button[data-testid="AppTabBar_Close_Button"]',
-        'button[data-testid="app-bar-close"]',
-        'button[aria-label="Close"]',
-        'button[aria-label="关闭"]',
-    ]
-    if not click_first(page, close_selectors):
+    try:
+        page.locator(CLOSE_BUTTONS).first.click(timeout=2000)
+    except PlaywrightTimeoutError:
         page.keyboard.press("Escape")
 
-    # Confirmation dialog: Save / Discard
-    if click_by_role(page, ["Save", "保存", "Draft", "草稿"]):
-        return
-
-    confirm_selectors = [
-        'button[data-testid="confirmationSheetConfirm"]',
-        'button[data-testid="confirm"]',
-    ]
-    click_first(page, confirm_selectors)
+    # Confirmation sheet: Save / Discard.
+    confirm = page.locator(CONFIRM_BUTTONS).or_(page.get_by_role("button", name=SAVE_NAME_RE)).first
+    confirm.click(timeout=5000)
+    # The draft is saved once the composer dialog is gone.
+    page.locator(COMPOSER_TEXTBOX).first.wait_for(state="hidden", timeout=10000)
 
 
 def trim_text(text: str, limit: int = 280) -> str:
@@ -86,7 +83,11 @@ def main() -> None:
     parser.add_argument("--limit", type=int, default=15)
     parser.add_argument("--browser", default="chrome", choices=["chrome", "edge", "chromium"])
     parser.add_argument("--headless", action="store_true")
-    parser.add_argument("--mark", action="store_true")
+    parser.add_argument(
+        "--mark",
+        action="store_true",
+        help="Record each drafted item as it is saved, so a rerun after a crash skips it",
+    )
     parser.add_argument("--debug", action="store_true")
     args = parser.parse_args()
 
@@ -111,6 +112,7 @@ def main() -> None:
             channel=channel,
             headless=args.headless,
         )
+        x_rate_limit.watch(context)
         page = context.new_page()
 
         for item in to_process:
@@ -118,10 +120,11 @@ def main() -> None:
             try:
                 open_compose(page)
                 fill_text(page, text)
-                time.sleep(0.5)
                 save_draft(page)
-                time.sleep(1.0)
                 item.status = "drafted"
+                if args.mark:
+                    append_status(args.queue, item.item_id, item.status)
+                x_rate_limit.succeeded()
                 print(f"Drafted Item {item.item_id:03d}")
             except PlaywrightTimeoutError:
                 print(f"Timeout on Item {item.item_id:03d} - skipped")
@@ -2,7 +2,7 @@
 set -euo pipefail
 
 if [ $# -lt 1 ]; then
-  echo "Usage: scripts/fetch_and_learn.sh <x_post_url> [browser] [proxy] [download_media] [manual_login]"
+  echo "Usage: scripts/fetch_and_learn.sh <x_post_url> [browser] [proxy] [download_media] [manual_login] [use_daemon]"
   echo "Example: scripts/fetch_and_learn.sh 'https://x.com/user/status/123' chromium http://172.18.96.1:7899 false true"
   exit 1
 fi
@@ -12,6 +12,7 @@ BROWSER="${2:-chromium}"
 PROXY="${3:-}"
 DOWNLOAD_MEDIA="${4:-false}"
 MANUAL_LOGIN="${5:-false}"
+USE_DAEMON="${6:-false}"
 
 ROOT="/home/sikai/ai-workspace/x-ops"
 cd "$ROOT"
@@ -33,6 +34,9 @@ fi
 if [ "$MANUAL_LOGIN" = "true" ]; then
   ARGS+=("--manual-login")
 fi
+if [ "$USE_DAEMON" = "true" ]; then
+  ARGS+=("--daemon")
+fi
 
 python "${ARGS[@]}"
 python scripts/learn_from_capture.py --url "$URL"
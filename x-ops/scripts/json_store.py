@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+
+class JsonLRUStore:
+    """Dict of JSON entries kept in one file and shared by worker threads.
+
+    Every read or write stamps the entry's ``used_at``; ``save`` keeps the ``max_entries`` most recently
+    used and replaces the file atomically.
+    """
+
+    def __init__(self, path: Path, max_entries: int) -> None:
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        if self.path.exists():
+            try:
+                self._entries = json.loads(self.path.read_text(encoding="utf-8"))
+            except Exception:
+                self._entries = {}
+
+    def get_entry(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry["used_at"] = time.time()
+            return dict(entry)
+
+    def put_entry(self, key: str, entry: Dict) -> None:
+        with self._lock:
+            self._entries[key] = {**entry, "used_at": time.time()}
+
+    def update_entry(self, key: str, **fields) -> None:
+        """Set fields on an existing entry (and mark it used); missing keys are ignored."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.update(fields)
+                entry["used_at"] = time.time()
+
+    def save(self) -> None:
+        with self._lock:
+            entries = self._entries
+            if len(entries) > self.max_entries:
+                keep = sorted(entries, key=lambda k: entries[k].get("used_at", 0), reverse=True)[: self.max_entries]
+                self._entries = {k: entries[k] for k in keep}
+            payload = json.dumps(self._entries, ensure_ascii=False, indent=2)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(payload + "\n", encoding="utf-8")
+        tmp.replace(self.path)
@@ -4,13 +4,17 @@ import argparse
 import json
 import re
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Set, Tuple
 
 ROOT = Path(__file__).resolve().parents[1]
 DATA_DIR = ROOT / "data"
 CAPTURE_DIR = DATA_DIR / "captured"
 LEARNED_DIR = DATA_DIR / "learned"
 KB_PATH = DATA_DIR / "knowledge" / "x_lessons.md"
+KB_MARKER_RE = re.compile(r"^<!-- status_id:(\S*) -->$")
+
+# kb path -> ((mtime_ns, size) of the KB when loaded, learned status ids)
+_KB_IDS: Dict[str, Tuple[Tuple[int, int], Set[str]]] = {}
 
 
 def _extract_status_id(url: str) -> str:
@@ -161,15 +165,62 @@ def _ensure_paths(capture_path: Path, learned_dir: Path, kb_path: Path) -> None:
     kb_path.parent.mkdir(parents=True, exist_ok=True)
 
 
+def _kb_ids_path(kb_path: Path) -> Path:
+    return kb_path.with_name(kb_path.name + ".ids")
+
+
+def _rebuild_kb_ids(kb_path: Path, ids_path: Path) -> None:
+    # One streaming pass over the KB markers; only needed when the sidecar is missing or the KB was edited by hand.
+    ids: List[str] = []
+    if kb_path.exists():
+        with kb_path.open(encoding="utf-8") as f:
+            for line in f:
+                m = KB_MARKER_RE.match(line.strip())
+                if m:
+                    ids.append(m.group(1))
+    tmp = ids_path.with_name(ids_path.name + ".tmp")
+    tmp.write_text("".join(f"{sid}\n" for sid in ids), encoding="utf-8")
+    tmp.replace(ids_path)
+
+
+def _kb_signature(kb_path: Path) -> Tuple[int, int]:
+    st = kb_path.stat()
+    return st.st_mtime_ns, st.st_size
+
+
+def _learned_ids(kb_path: Path) -> Set[str]:
+    """Status ids already in the KB, from the sidecar next to it; loaded once per process.
+
+    The set is reloaded only when the KB changed since it was loaded (another process appended, or it
+    was edited by hand).
+    """
+    key = str(kb_path)
+    ids_path = _kb_ids_path(kb_path)
+    if not kb_path.exists():
+        # KB deleted or never written: a leftover sidecar would make every capture look learned.
+        ids_path.unlink(missing_ok=True)
+        _KB_IDS.pop(key, None)
+        return set()
+    signature = _kb_signature(kb_path)
+    cached = _KB_IDS.get(key)
+    if cached and cached[0] == signature:
+        return cached[1]
+    # Every append writes the KB before the sidecar, so a KB newer than its sidecar was changed elsewhere.
+    if not ids_path.exists() or kb_path.stat().st_mtime > ids_path.stat().st_mtime:
+        _rebuild_kb_ids(kb_path, ids_path)
+    ids = set(ids_path.read_text(encoding="utf-8").split())
+    _KB_IDS[key] = (signature, ids)
+    return ids
+
+
 def _append_kb(kb_path: Path, data: Dict, points: List[str], learned_path: Path) -> bool:
     sid = data.get("target_status_id", "")
     marker = f"<!-- status_id:{sid} -->"
 
-    if kb_path.exists():
-        existing = kb_path.read_text(encoding="utf-8")
-        if marker in existing:
-            return False
-    else:
+    learned = _learned_ids(kb_path)
+    if sid in learned:
+        return False
+    if not kb_path.exists():
         kb_path.write_text("# X Lessons KB\n\n", encoding="utf-8")
 
     main = data.get("main", {})
@@ -188,9 +239,50 @@ def _append_kb(kb_path: Path, data: Dict, points: List[str], learned_path: Path)
     with kb_path.open("a", encoding="utf-8") as f:
         f.write("\n".join(lines))
         f.write("\n")
+    with _kb_ids_path(kb_path).open("a", encoding="utf-8") as f:
+        f.write(f"{sid}\n")
+    learned.add(sid)
+    _KB_IDS[str(kb_path)] = (_kb_signature(kb_path), learned)
     return True
 
 
+def learn_capture(
+    data: Dict,
+    capture_path: Path,
+    output: str = "",
+    max_points: int = 8,
+    kb_path: Path = KB_PATH,
+) -> Dict:
+    """Write the learned note for an in-memory capture and append it to the KB; returns the CLI summary."""
+    texts = [data.get("main", {}).get("text", "")]
+    texts.extend(item.get("text", "") for item in data.get("thread", []))
+    texts.extend(item.get("text", "") for item in data.get("articles", []))
+    texts = [t for t in texts if _clean(t)]
+
+    points = _top_points(texts, limit=max_points)
+    content = _render_learning_md(data, points)
+
+    if output:
+        out_path = Path(output)
+    else:
+        status_id = data.get("target_status_id") or _extract_status_id(data.get("url", "")) or "unknown"
+        out_path = LEARNED_DIR / f"{status_id}.md"
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(content, encoding="utf-8")
+    kb_path.parent.mkdir(parents=True, exist_ok=True)
+
+    appended = _append_kb(kb_path, data, points, out_path)
+
+    return {
+        "capture": str(capture_path),
+        "learned": str(out_path),
+        "kb": str(kb_path),
+        "kb_appended": appended,
+        "points": len(points),
+    }
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Generate learning notes from captured X post")
     parser.add_argument("--url", default="", help="X post URL; used to infer capture file")
@@ -221,32 +313,7 @@ def main() -> None:
 
     data = json.loads(capture_path.read_text(encoding="utf-8"))
 
-    texts = [data.get("main", {}).get("text", "")]
-    texts.extend(item.get("text", "") for item in data.get("thread", []))
-    texts.extend(item.get("text", "") for item in data.get("articles", []))
-    texts = [t for t in texts if _clean(t)]
-
-    points = _top_points(texts, limit=args.max_points)
-    content = _render_learning_md(data, points)
-
-    if args.output:
-        out_path = Path(args.output)
-    else:
-        status_id = data.get("target_status_id", sid) or "unknown"
-        out_path = learned_dir / f"{status_id}.md"
-
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_text(content, encoding="utf-8")
-
-    appended = _append_kb(kb_path, data, points, out_path)
-
-    result = {
-        "capture": str(capture_path),
-        "learned": str(out_path),
-        "kb": str(kb_path),
-        "kb_appended": appended,
-        "points": len(points),
-    }
+    result = learn_capture(data, capture_path, args.output, args.max_points, kb_path)
     print(json.dumps(result, ensure_ascii=False, indent=2))
 
 
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import hashlib
+import time
+from pathlib import Path
+from typing import Optional
+
+from json_store import JsonLRUStore
+
+ROOT = Path(__file__).resolve().parents[1]
+CACHE_PATH = ROOT / "data" / "llm_cache.json"
+
+DEFAULT_MAX_ENTRIES = 500
+
+
+class LLMCache(JsonLRUStore):
+    """LLM output per (command, template, prompt), so reruns with identical prompts cost nothing.
+
+    Only non-empty outputs are stored; ``save`` keeps the ``max_entries`` most recently used.
+    """
+
+    def __init__(self, path: Path = CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        super().__init__(path, max_entries)
+
+    @staticmethod
+    def key(command: str, template: str, prompt: str) -> str:
+        h = hashlib.sha256()
+        for part in (command, template, prompt):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.get_entry(key)
+        return entry["text"] if entry is not None else None
+
+    def put(self, key: str, template: str, text: str) -> None:
+        if not text:
+            return
+        self.put_entry(key, {"template": template, "text": text, "created_at": time.time()})
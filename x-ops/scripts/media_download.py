@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import requests
+
+from media_store import MediaStore
+from utils import new_session
+
+CHUNK_SIZE = 64 * 1024
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class TransientDownloadError(RuntimeError):
+    pass
+
+
+def _validator_path(part: Path) -> Path:
+    return part.with_suffix(".etag")
+
+
+def _strong_validator(headers) -> str:
+    """ETag (or Last-Modified) usable in If-Range; weak ETags are not allowed there."""
+    etag = headers.get("ETag", "")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return headers.get("Last-Modified", "")
+
+
+def _fetch_to_file(
+    session: requests.Session, url: str, part: Path, timeout: int, if_none_match: str = ""
+) -> Optional[str]:
+    """Stream url into part, resuming a previous partial download. Returns the response ETag.
+
+    A partial file is only resumed with If-Range on the validator saved when it was started, so bytes
+    of a changed file are never appended to it. With ``if_none_match``, returns None on 304.
+    """
+    headers: Dict[str, str] = {}
+    validator_path = _validator_path(part)
+    offset = part.stat().st_size if part.exists() else 0
+    validator = validator_path.read_text(encoding="utf-8").strip() if validator_path.exists() else ""
+    if if_none_match:
+        headers["If-None-Match"] = if_none_match
+    elif offset and validator:
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = validator
+    else:
+        # Nothing to resume, or no validator to resume it safely.
+        offset = 0
+
+    try:
+        with session.get(url, headers=headers, stream=True, timeout=timeout) as r:
+            if r.status_code == 304 and if_none_match:
+                return None
+            if r.status_code in RETRY_STATUS:
+                raise TransientDownloadError(f"HTTP {r.status_code}")
+            if r.status_code == 416:
+                # Range past the end: the partial file is stale, start over next attempt.
+                part.unlink()
+                validator_path.unlink(missing_ok=True)
+                raise TransientDownloadError("HTTP 416")
+            r.raise_for_status()
+            # 206 continues the partial file; a 200 (server ignored Range, or If-Range saw a changed
+            # file) starts it over under the new validator.
+            if r.status_code == 206 and offset:
+                mode = "ab"
+            else:
+                mode = "wb"
+                validator_path.write_text(_strong_validator(r.headers), encoding="utf-8")
+            with part.open(mode) as f:
+                for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                    if chunk:
+                        f.write(chunk)
+            validator_path.unlink(missing_ok=True)
+            return r.headers.get("ETag", "")
+    except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as exc:
+        raise TransientDownloadError(str(exc)) from exc
+
+
+def _download_one(session: requests.Session, store: MediaStore, url: str, retries: int, timeout: int) -> Optional[Path]:
+    # Same source URL already stored by any earlier capture: skip it, after a bodyless If-None-Match
+    # check when the server gave an ETag.
+    existing = store.lookup(url)
+    stored_etag = store.etag(url) if existing is not None else ""
+    if existing is not None and not stored_etag:
+        return existing
+
+    part = store.tmp_path(url)
+    for attempt in range(retries + 1):
+        try:
+            etag = _fetch_to_file(session, url, part, timeout, if_none_match=stored_etag)
+            if etag is None:
+                return store.lookup(url, stored_etag)
+            return store.add(url, part, etag)
+        except TransientDownloadError:
+            if attempt == retries:
+                # Offline or throttled: a stored copy beats nothing.
+                return existing
+            time.sleep(min(2 ** attempt, 8))
+        except Exception:
+            return existing
+    return existing
+
+
+def download_all(
+    urls: List[str],
+    store: MediaStore,
+    workers: int = 4,
+    retries: int = 3,
+    timeout: int = 30,
+) -> List[str]:
+    """Download urls into the content-addressed store; returns blob paths in input order.
+
+    Runs with bounded concurrency on one pooled session. Stored URLs are skipped when their size and
+    ETag still match. Interrupted downloads resume with Range + If-Range, and connection errors, 429
+    and 5xx are retried with exponential backoff.
+    """
+    if not urls:
+        return []
+    workers = max(1, min(workers, len(urls)))
+    session = new_session(workers)
+
+    def _run(url: str) -> Optional[Path]:
+        return _download_one(session, store, url, retries, timeout)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run, urls))
+    finally:
+        session.close()
+        store.save()
+    return [str(p) for p in results if p is not None]
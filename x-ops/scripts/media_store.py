@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+INDEX_NAME = "index.json"
+LOCK_NAME = "index.lock"
+BLOB_DIR_NAME = "blobs"
+TMP_DIR_NAME = "tmp"
+
+
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def media_ext(url: str) -> str:
+    qs = parse_qs(urlparse(url).query)
+    ext = qs.get("format", [""])[0]
+    if not ext:
+        tail = urlparse(url).path.rsplit("/", 1)[-1]
+        ext = tail.rsplit(".", 1)[1] if "." in tail else ""
+    return (ext or "jpg").lower()
+
+
+class MediaStore:
+    """Content-addressed media blobs shared by all captures.
+
+    Layout under root: ``blobs/<aa>/<sha256>.<ext>`` plus ``index.json`` mapping source URL to blob,
+    so an image quoted in many posts is downloaded and stored once.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+        self.blob_dir = self.root / BLOB_DIR_NAME
+        self.tmp_dir = self.root / TMP_DIR_NAME
+        self.index_path = self.root / INDEX_NAME
+        self._lock = threading.Lock()
+        self._index: Dict[str, Dict] = {}
+        if self.index_path.exists():
+            try:
+                self._index = json.loads(self.index_path.read_text(encoding="utf-8"))
+            except Exception:
+                self._index = {}
+
+    def lookup(self, url: str, etag: str = "") -> Optional[Path]:
+        """Stored blob for url if it is intact (size matches) and, when ``etag`` is given, still current."""
+        with self._lock:
+            entry = self._index.get(url)
+        if not entry:
+            return None
+        if etag and entry.get("etag") and entry["etag"] != etag:
+            return None
+        path = self.root / entry["blob"]
+        if not path.exists() or path.stat().st_size != entry.get("size"):
+            return None
+        return path
+
+    def etag(self, url: str) -> str:
+        with self._lock:
+            entry = self._index.get(url)
+        return (entry or {}).get("etag", "")
+
+    def tmp_path(self, url: str) -> Path:
+        """Stable scratch file per URL so an interrupted download can resume."""
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        return self.tmp_dir / hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def add(self, url: str, downloaded: Path, etag: str = "") -> Path:
+        """Move a finished download into the store (or drop it if the blob exists) and index it."""
+        digest = _sha256_file(downloaded)
+        rel = Path(BLOB_DIR_NAME) / digest[:2] / f"{digest}.{media_ext(url)}"
+        blob = self.root / rel
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        if blob.exists():
+            downloaded.unlink()
+        else:
+            downloaded.replace(blob)
+        with self._lock:
+            self._index[url] = {"blob": rel.as_posix(), "sha256": digest, "size": blob.stat().st_size, "etag": etag}
+        return blob
+
+    def save(self) -> None:
+        """Merge into index.json under an exclusive lock held across processes (daemon, batch runs)."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self._lock, (self.root / LOCK_NAME).open("a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                # Keep entries another process added since this store was loaded.
+                if self.index_path.exists():
+                    try:
+                        on_disk = json.loads(self.index_path.read_text(encoding="utf-8"))
+                        self._index = {**on_disk, **self._index}
+                    except Exception:
+                        pass
+                tmp = self.index_path.with_name(f"{INDEX_NAME}.{os.getpid()}.tmp")
+                tmp.write_text(json.dumps(self._index, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+                tmp.replace(self.index_path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from json_store import JsonLRUStore
+
+ROOT = Path(__file__).resolve().parents[1]
+CACHE_PATH = ROOT / "data" / "metadata_cache.json"
+
+DEFAULT_TTL_HOURS = 24.0
+DEFAULT_MAX_ENTRIES = 2000
+
+
+class MetadataCache(JsonLRUStore):
+    """Page title/summary per URL, with the validators needed for conditional GETs.
+
+    Entries younger than ``ttl_hours`` are served without a request; older ones are revalidated
+    with If-None-Match / If-Modified-Since. ``save`` keeps the ``max_entries`` most recently used.
+    """
+
+    def __init__(
+        self,
+        path: Path = CACHE_PATH,
+        ttl_hours: float = DEFAULT_TTL_HOURS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        super().__init__(path, max_entries)
+        self.ttl_s = ttl_hours * 3600
+
+    def get(self, url: str) -> Optional[Dict]:
+        return self.get_entry(url)
+
+    def is_fresh(self, entry: Dict) -> bool:
+        return time.time() - entry.get("fetched_at", 0) < self.ttl_s
+
+    def put(self, url: str, title: str, summary: str, etag: str = "", last_modified: str = "") -> None:
+        self.put_entry(
+            url,
+            {
+                "title": title,
+                "summary": summary,
+                "etag": etag,
+                "last_modified": last_modified,
+                "fetched_at": time.time(),
+            },
+        )
+
+    def revalidated(self, url: str) -> None:
+        """Server answered 304: the cached title/summary is current again."""
+        self.update_entry(url, fetched_at=time.time())
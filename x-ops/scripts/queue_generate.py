@@ -3,19 +3,30 @@ from __future__ import annotations
 import argparse
 import datetime as dt
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
 
 import yaml
 import feedparser
 
+from llm_cache import LLMCache
+from metadata_cache import DEFAULT_TTL_HOURS as METADATA_TTL_HOURS, MetadataCache
 from queue_io import QueueItem, write_queue_md
-from utils import SeedItem, fetch_metadata, infer_github_repo, parse_seeds, run_llm_command
+from utils import SeedItem, fetch_metadata, infer_github_repo, new_session, parse_seeds, run_llm_command
 
 ROOT = Path(__file__).resolve().parents[1]
 DATA_DIR = ROOT / "data"
 TEMPLATE_DIR = DATA_DIR / "templates"
 
+# Sections with an LLM template; other sections always use fallback_text.
+LLM_SECTIONS = {"ai_hotspot", "openclaw", "github_trending"}
+LLM_TIMEOUT_S = 60
+METADATA_TIMEOUT_S = 12
+
 
 def load_config(path: Path) -> Dict:
     with open(path, "r", encoding="utf-8") as f:
@@ -71,7 +82,13 @@ def fallback_text(item: SeedItem, lang: str) -> str:
     return truncate(f"更新：{title}\n{summary}\n来源：{item.url}")
 
 
-def render_with_llm(template_name: str, item: SeedItem, llm_cfg: Dict) -> str:
+def render_with_llm(
+    template_name: str,
+    item: SeedItem,
+    llm_cfg: Dict,
+    timeout: float = 60,
+    cache: Optional[LLMCache] = None,
+) -> str:
     if llm_cfg.get("mode") != "command":
         return ""
     command = llm_cfg.get("command")
@@ -88,10 +105,55 @@ def render_with_llm(template_name: str, item: SeedItem, llm_cfg: Dict) -> str:
         url=item.url,
         note=item.note,
     )
-    return run_llm_command(command, prompt)
-
-
-def build_items(sections: Dict[str, List[SeedItem]], llm_cfg: Dict, limit: int) -> List[QueueItem]:
+    key = ""
+    if cache is not None:
+        key = LLMCache.key(command, template_name, prompt)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    text = run_llm_command(command, prompt, timeout=timeout)
+    if cache is not None:
+        cache.put(key, template_name, text)
+    return text
+
+
+def render_all_with_llm(
+    seeds: List[SeedItem],
+    llm_cfg: Dict,
+    workers: int = 4,
+    deadline_s: float = 300.0,
+    cache: Optional[LLMCache] = None,
+) -> List[str]:
+    """LLM text per seed ("" = use fallback), rendered ``workers`` at a time.
+
+    Each call's timeout is cut to the time left before the shared deadline, so seeds that would
+    finish late (or never start) fall back to ``fallback_text`` instead of stalling the queue build.
+    """
+    deadline = time.monotonic() + deadline_s
+
+    def _render(seed: SeedItem) -> str:
+        if seed.section not in LLM_SECTIONS:
+            return ""
+        remaining = deadline - time.monotonic()
+        if remaining < 1:
+            return ""
+        return render_with_llm(seed.section, seed, llm_cfg, timeout=min(LLM_TIMEOUT_S, remaining), cache=cache)
+
+    if llm_cfg.get("mode") != "command" or not llm_cfg.get("command") or not seeds:
+        return ["" for _ in seeds]
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(seeds)))) as pool:
+        # map keeps input order, so item ids and languages stay the same as a sequential run.
+        return list(pool.map(_render, seeds))
+
+
+def build_items(
+    sections: Dict[str, List[SeedItem]],
+    llm_cfg: Dict,
+    limit: int,
+    llm_workers: int = 4,
+    llm_deadline_s: float = 300.0,
+    llm_cache: Optional[LLMCache] = None,
+) -> List[QueueItem]:
     items: List[QueueItem] = []
     order = ["ai_hotspot", "openclaw", "github_trending"]
     merged: List[SeedItem] = []
@@ -101,18 +163,15 @@ def build_items(sections: Dict[str, List[SeedItem]], llm_cfg: Dict, limit: int)
     if not merged:
         return items
 
-    for idx, seed in enumerate(merged[:limit]):
+    seeds = merged[:limit]
+    rendered = render_all_with_llm(seeds, llm_cfg, llm_workers, llm_deadline_s, llm_cache)
+
+    for idx, seed in enumerate(seeds):
         lang = "zh"
         if (idx + 1) % 6 == 0:
             lang = "en"
 
-        text = ""
-        if seed.section == "ai_hotspot":
-            text = render_with_llm("ai_hotspot", seed, llm_cfg)
-        elif seed.section == "openclaw":
-            text = render_with_llm("openclaw", seed, llm_cfg)
-        elif seed.section == "github_trending":
-            text = render_with_llm("github_trending", seed, llm_cfg)
+        text = rendered[idx]
 
         if not text:
             text = fallback_text(seed, lang)
@@ -132,12 +191,61 @@ def build_items(sections: Dict[str, List[SeedItem]], llm_cfg: Dict, limit: int)
     return items
 
 
-def enrich_seeds(sections: Dict[str, List[SeedItem]]) -> None:
+def enrich_seeds(
+    sections: Dict[str, List[SeedItem]],
+    workers: int = 8,
+    per_host: int = 2,
+    deadline_s: float = 45.0,
+    cache: Optional[MetadataCache] = None,
+) -> None:
+    """Fetch title/summary for every seed URL concurrently.
+
+    At most ``per_host`` requests go to one site at a time. Seeds still pending after ``deadline_s``
+    keep their existing title/summary (``fallback_text`` covers them), so one slow site cannot hold up
+    the queue build. Each request's timeout is capped at the time left, so requests still in flight at
+    the deadline end shortly after it (the interpreter joins them at exit).
+    """
+    by_url: Dict[str, List[SeedItem]] = {}
     for items in sections.values():
         for item in items:
-            meta = fetch_metadata(item.url)
-            item.title = meta.get("title", "") or item.title
-            item.summary = meta.get("summary", "") or item.summary
+            by_url.setdefault(item.url, []).append(item)
+    if not by_url:
+        return
+
+    host_slots: Dict[str, threading.BoundedSemaphore] = {}
+    for url in by_url:
+        host = (urlparse(url).hostname or "").lower()
+        host_slots.setdefault(host, threading.BoundedSemaphore(per_host))
+
+    workers = max(1, min(workers, len(by_url)))
+    session = new_session(workers)
+    deadline = time.monotonic() + deadline_s
+
+    def _fetch(url: str) -> Dict[str, str]:
+        with host_slots[(urlparse(url).hostname or "").lower()]:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                # Waited past the deadline for a per-host slot; the result would be discarded anyway.
+                return {}
+            return fetch_metadata(url, timeout=min(METADATA_TIMEOUT_S, remaining), session=session, cache=cache)
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    futures = {pool.submit(_fetch, url): url for url in by_url}
+    done = 0
+    try:
+        for future in as_completed(futures, timeout=deadline_s):
+            meta = future.result()
+            for item in by_url[futures[future]]:
+                item.title = meta.get("title", "") or item.title
+                item.summary = meta.get("summary", "") or item.summary
+            done += 1
+    except FuturesTimeoutError:
+        print(f"Metadata deadline ({deadline_s:g}s) reached; {len(by_url) - done} seed(s) left unenriched.")
+    finally:
+        # Return now; queued fetches are cancelled and running ones end within their capped timeout.
+        pool.shutdown(wait=False, cancel_futures=True)
+        if done == len(by_url):
+            session.close()
 
 
 def add_rss_seeds(sections: Dict[str, List[SeedItem]], rss_urls: List[str], per_feed: int = 5) -> None:
@@ -169,6 +277,24 @@ def main() -> None:
     parser.add_argument("--queue", default=str(DATA_DIR / "queue.md"))
     parser.add_argument("--seeds", default=str(DATA_DIR / "seeds.md"))
     parser.add_argument("--config", default=str(DATA_DIR / "sources.yaml"))
+    parser.add_argument("--enrich-workers", type=int, default=8, help="Concurrent seed metadata fetches")
+    parser.add_argument("--enrich-per-host", type=int, default=2, help="Concurrent fetches per site")
+    parser.add_argument("--enrich-deadline", type=float, default=45.0, help="Seconds to spend on seed metadata")
+    parser.add_argument(
+        "--metadata-ttl-hours",
+        type=float,
+        default=METADATA_TTL_HOURS,
+        help="Reuse cached seed title/summary younger than this; older entries are revalidated",
+    )
+    parser.add_argument("--no-metadata-cache", action="store_true", help="Fetch every seed page again")
+    parser.add_argument("--llm-workers", type=int, default=4, help="Concurrent LLM rewrite commands")
+    parser.add_argument(
+        "--llm-deadline",
+        type=float,
+        default=300.0,
+        help="Seconds for all LLM rewrites; items not done by then use the template fallback",
+    )
+    parser.add_argument("--no-llm-cache", action="store_true", help="Run the LLM command even for prompts seen before")
     args = parser.parse_args()
 
     config = load_config(Path(args.config))
@@ -182,10 +308,16 @@ def main() -> None:
         .get("rss", [])
     )
     add_rss_seeds(sections, rss_urls)
-    enrich_seeds(sections)
+    cache = None if args.no_metadata_cache else MetadataCache(ttl_hours=args.metadata_ttl_hours)
+    enrich_seeds(sections, args.enrich_workers, args.enrich_per_host, args.enrich_deadline, cache)
+    if cache is not None:
+        cache.save()
 
     llm_cfg = config.get("llm", {})
-    items = build_items(sections, llm_cfg, limit)
+    llm_cache = None if args.no_llm_cache else LLMCache()
+    items = build_items(sections, llm_cfg, limit, args.llm_workers, args.llm_deadline, llm_cache)
+    if llm_cache is not None:
+        llm_cache.save()
 
     header_lines = [
         f"# X Queue - {date_str}",
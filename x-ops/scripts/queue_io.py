@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import json
+import os
 from dataclasses import dataclass
-from typing import List, Tuple
+from pathlib import Path
+from typing import Dict, List, Tuple
 
 
 @dataclass
@@ -18,6 +21,36 @@ class QueueItem:
 HEADER_PREFIX = "# X Queue"
 
 
+def status_journal_path(path: str) -> Path:
+    """Append-only ``{"item_id", "status"}`` lines recorded since queue.md was last written."""
+    return Path(f"{path}.status.jsonl")
+
+
+def load_status_journal(path: str) -> Dict[int, str]:
+    statuses: Dict[int, str] = {}
+    journal = status_journal_path(path)
+    if not journal.exists():
+        return statuses
+    with journal.open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+                statuses[int(entry["item_id"])] = str(entry["status"])
+            except Exception:
+                # A crash mid-append leaves at most one torn last line.
+                continue
+    return statuses
+
+
+def append_status(path: str, item_id: int, status: str) -> None:
+    """Durably record one item's new status without rewriting queue.md."""
+    line = json.dumps({"item_id": item_id, "status": status}, ensure_ascii=False)
+    with status_journal_path(path).open("a", encoding="utf-8") as f:
+        f.write(line + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
 def parse_queue_md(path: str) -> Tuple[List[str], List[QueueItem]]:
     with open(path, "r", encoding="utf-8") as f:
         lines = f.read().splitlines()
@@ -84,6 +117,11 @@ def parse_queue_md(path: str) -> Tuple[List[str], List[QueueItem]]:
                 current.note = value
 
     flush_current()
+
+    statuses = load_status_journal(path)
+    for item in items:
+        if item.item_id in statuses:
+            item.status = statuses[item.item_id]
     return header_lines, items
 
 
@@ -109,6 +147,12 @@ def render_queue_md(header_lines: List[str], items: List[QueueItem]) -> str:
 
 
 def write_queue_md(path: str, header_lines: List[str], items: List[QueueItem]) -> None:
+    """Atomically replace queue.md; the status journal is folded in, so it is cleared."""
     content = render_queue_md(header_lines, items)
-    with open(path, "w", encoding="utf-8") as f:
+    tmp = Path(f"{path}.tmp")
+    with tmp.open("w", encoding="utf-8") as f:
         f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    tmp.replace(path)
+    status_journal_path(path).unlink(missing_ok=True)
@@ -4,15 +4,24 @@ import argparse
 import json
 import os
 import re
+import sqlite3
+import sys
+from collections import deque
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Deque, Dict, List, Optional, Set, Tuple
 from urllib.parse import parse_qs, urlparse
 
-import requests
 from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
 from playwright.sync_api import sync_playwright
 
+import capture_client
+import capture_index
+import x_rate_limit
+from media_download import download_all
+from media_store import MediaStore
+from tweet_graphql import is_tweet_detail_url, items_from_payloads
+
 ROOT = Path(__file__).resolve().parents[1]
 DATA_DIR = ROOT / "data"
 PROFILE_DIR = DATA_DIR / "profile"
@@ -21,6 +30,10 @@ DEBUG_DIR = DATA_DIR / "debug"
 MEDIA_DIR = DATA_DIR / "media"
 
 
+class NotLoggedInError(RuntimeError):
+    """The X session in the browser profile is logged out; every capture would fail."""
+
+
 def _clean(text: str) -> str:
     return re.sub(r"\s+", " ", (text or "")).strip()
 
@@ -116,13 +129,60 @@ def _inject_x_cookies(context, cookie_string: str = "", cookie_file: str = "") -
     return True
 
 
-def _article_status_links(article) -> List[Tuple[str, str]]:
+# Everything _article_from_payload needs from one article, as raw strings.
+# Normalization and filtering stay in Python so the result shape is unchanged.
+ARTICLE_PAYLOAD_JS = """(article) => {
+    const textSels = [
+        '[data-testid="tweetText"]',
+        "[class*='longform-header-one']",
+        "[class*='longform-header-two']",
+        "[class*='longform-unstyled']",
+        "[class*='longform-blockquote']",
+        "[class*='longform-unordered-list-item']",
+        "[class*='longform-ordered-list-item']",
+        "div[data-contents='true'] [data-block='true']",
+    ];
+    const mediaSels = [
+        ['a[href*="/photo/"] img[src]', "src"],
+        ['div[data-testid="tweetPhoto"] img[src]', "src"],
+        ["video[poster]", "poster"],
+    ];
+    const texts = [];
+    for (const sel of textSels) {
+        const nodes = article.querySelectorAll(sel);
+        const count = Math.min(nodes.length, 600);
+        for (let i = 0; i < count; i++) texts.push(nodes[i].innerText || "");
+    }
+    const media = [];
+    for (const [sel, attr] of mediaSels) {
+        for (const n of article.querySelectorAll(sel)) media.push(n.getAttribute(attr) || "");
+    }
+    const hrefs = (sel) => Array.from(article.querySelectorAll(sel), (a) => a.getAttribute("href") || "");
+    const userNode = article.querySelector('div[data-testid="User-Name"]');
+    const timeNode = article.querySelector("time");
+    const permalink = timeNode ? timeNode.closest("a") : null;
+    return {
+        texts,
+        user: userNode ? userNode.innerText || "" : "",
+        timestamp: timeNode ? timeNode.getAttribute("datetime") || "" : "",
+        permalink: permalink ? permalink.getAttribute("href") || "" : "",
+        status_hrefs: hrefs('a[href*="/status/"]'),
+        article_hrefs: hrefs('a[href*="/article/"]'),
+        media,
+    };
+}"""
+
+ARTICLES_PAYLOAD_JS = (
+    "(nodes, limit) => { const extract = "
+    + ARTICLE_PAYLOAD_JS
+    + "; return nodes.slice(0, limit).map((n) => extract(n)); }"
+)
+
+
+def _article_status_links(payload: Dict) -> List[Tuple[str, str]]:
     links: List[Tuple[str, str]] = []
     seen: Set[str] = set()
-    a_nodes = article.locator('a[href*="/status/"]')
-    count = a_nodes.count()
-    for i in range(count):
-        href = a_nodes.nth(i).get_attribute("href") or ""
+    for href in payload.get("status_hrefs", []):
         sid = _extract_status_id(href)
         if not sid:
             continue
@@ -145,31 +205,20 @@ def _normalize_media_url(url: str) -> str:
     return url
 
 
-def _extract_media(article) -> List[str]:
+def _extract_media(payload: Dict) -> List[str]:
     media: List[str] = []
     seen: Set[str] = set()
 
-    selectors = [
-        'a[href*="/photo/"] img[src]',
-        'div[data-testid="tweetPhoto"] img[src]',
-        'video[poster]',
-    ]
-
-    for sel in selectors:
-        nodes = article.locator(sel)
-        count = nodes.count()
-        for i in range(count):
-            attr = "poster" if "video" in sel else "src"
-            raw = nodes.nth(i).get_attribute(attr) or ""
-            src = _normalize_media_url(raw)
-            if not src:
-                continue
-            if not ("pbs.twimg.com/media/" in src or "pbs.twimg.com/ext_tw_video_thumb/" in src):
-                continue
-            if src in seen:
-                continue
-            seen.add(src)
-            media.append(src)
+    for raw in payload.get("media", []):
+        src = _normalize_media_url(raw)
+        if not src:
+            continue
+        if not ("pbs.twimg.com/media/" in src or "pbs.twimg.com/ext_tw_video_thumb/" in src):
+            continue
+        if src in seen:
+            continue
+        seen.add(src)
+        media.append(src)
 
     return media
 
@@ -186,13 +235,10 @@ def _normalize_article_url(url: str) -> str:
     return url
 
 
-def _extract_article_links(article) -> List[str]:
+def _extract_article_links(payload: Dict) -> List[str]:
     urls: List[str] = []
     seen: Set[str] = set()
-    nodes = article.locator('a[href*="/article/"]')
-    count = nodes.count()
-    for i in range(count):
-        href = nodes.nth(i).get_attribute("href") or ""
+    for href in payload.get("article_hrefs", []):
         u = _normalize_article_url(href)
         if not u:
             continue
@@ -219,24 +265,37 @@ def _collect_article_text(page) -> str:
         "main article div[dir='auto']",
         "main p",
     ]
+    try:
+        values = page.evaluate(
+            """(sels) => {
+                const out = [];
+                for (const sel of sels) {
+                    const nodes = document.querySelectorAll(sel);
+                    const count = Math.min(nodes.length, 500);
+                    for (let i = 0; i < count; i++) out.push(nodes[i].innerText || "");
+                }
+                return out;
+            }""",
+            selectors,
+        )
+    except Exception:
+        return ""
+
     parts: List[str] = []
     seen: Set[str] = set()
-    for sel in selectors:
-        nodes = page.locator(sel)
-        count = min(nodes.count(), 500)
-        for i in range(count):
-            t = _clean(nodes.nth(i).inner_text())
-            if not t:
-                continue
-            # Filter login chrome noise.
-            if t in {"Log in", "Sign up", "Sign in", "Sign up for X"}:
-                continue
-            if len(t) < 2:
-                continue
-            if t in seen:
-                continue
-            seen.add(t)
-            parts.append(t)
+    for raw in values or []:
+        t = _clean(raw)
+        if not t:
+            continue
+        # Filter login chrome noise.
+        if t in {"Log in", "Sign up", "Sign in", "Sign up for X"}:
+            continue
+        if len(t) < 2:
+            continue
+        if t in seen:
+            continue
+        seen.add(t)
+        parts.append(t)
 
     merged = "\n".join(parts).strip()
     return merged
@@ -279,12 +338,18 @@ def _collect_longform_text_via_dom(page) -> str:
 
 
 def _collect_jsonld_article_text(page) -> str:
-    nodes = page.locator('script[type="application/ld+json"]')
-    count = min(nodes.count(), 30)
+    try:
+        raws = page.evaluate(
+            """() => Array.from(
+                document.querySelectorAll('script[type="application/ld+json"]'),
+                (n) => n.textContent || "",
+            ).slice(0, 30)"""
+        )
+    except Exception:
+        return ""
     parts: List[str] = []
     seen: Set[str] = set()
-    for i in range(count):
-        raw = nodes.nth(i).text_content() or ""
+    for raw in raws or []:
         raw = raw.strip()
         if not raw:
             continue
@@ -310,151 +375,173 @@ def _collect_jsonld_article_text(page) -> str:
     return "\n".join(parts).strip()
 
 
-def _extract_long_article(context, url: str, timeout_ms: int) -> Dict[str, str]:
-    page = context.new_page()
-    item = {
+# Article body blocks only: page chrome (nav, login links, card text) renders before them and would end
+# the wait early.
+ARTICLE_READY_SELECTOR = ", ".join(
+    [
+        "div[class*='longform-']",
+        ".public-DraftStyleDefault-block",
+        "div[data-contents='true'] div[data-block='true']",
+    ]
+)
+
+
+def _new_article_item(url: str) -> Dict[str, str]:
+    return {
         "url": url,
         "final_url": "",
         "status": "unknown",
         "title": "",
         "text": "",
     }
-    try:
-        page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
-        page.wait_for_timeout(2500)
-        item["final_url"] = page.url
-
-        title = _clean(page.title())
-        if title:
-            item["title"] = title
-
-        # Prefer h1 when available.
-        h1 = page.locator("h1")
-        if h1.count() > 0:
-            h1_text = _clean(h1.first.inner_text())
-            if h1_text:
-                item["title"] = h1_text
-
-        text = _collect_article_text(page)
-        if not text:
-            text = _collect_longform_text_via_dom(page)
-        if not text:
-            text = _collect_jsonld_article_text(page)
-        if not text:
-            try:
-                meta_desc = _clean(
-                    page.locator('meta[property="og:description"]').first.get_attribute("content") or ""
-                )
-                if len(meta_desc) >= 20:
-                    text = meta_desc
-            except Exception:
-                pass
-        item["text"] = text
-        if len(text) >= 20:
-            item["status"] = "ok"
-            return item
 
-        # X article pages may require login even when status card is visible.
-        if "/login" in page.url or "/i/flow/" in page.url:
-            item["status"] = "login_required"
-            return item
 
-        login_like = (
-            page.locator('a[href="/login"]').count() > 0
-            or page.locator('a[href*="/signup"]').count() > 0
-            or "log in" in (page.content() or "").lower()
-        )
-        if login_like:
-            item["status"] = "login_required"
-        elif _clean(item.get("title", "")).lower() == "x":
-            item["status"] = "access_limited"
-        else:
-            item["status"] = "no_text"
-        return item
+def _read_long_article(page, item: Dict[str, str], timeout_ms: int, settle_ms: int = 2500) -> None:
+    """Fill item from an article page whose navigation has already been started."""
+    page.wait_for_load_state("domcontentloaded", timeout=timeout_ms)
+    try:
+        # Replaces the old fixed 2.5 s sleep: return as soon as article blocks mount.
+        page.wait_for_selector(ARTICLE_READY_SELECTOR, timeout=settle_ms)
     except PlaywrightTimeoutError:
-        item["status"] = "timeout"
-        return item
-    except Exception:
-        item["status"] = "error"
-        return item
-    finally:
+        # No body blocks within the old settle time; a login redirect explains why, anything else
+        # falls through to the text fallbacks below.
+        if "/login" in page.url or "/i/flow/" in page.url:
+            item["final_url"] = page.url
+            item["status"] = "login_required"
+            return
+    item["final_url"] = page.url
+
+    title = _clean(page.title())
+    if title:
+        item["title"] = title
+
+    # Prefer h1 when available.
+    h1 = page.locator("h1")
+    if h1.count() > 0:
+        h1_text = _clean(h1.first.inner_text())
+        if h1_text:
+            item["title"] = h1_text
+
+    text = _collect_article_text(page)
+    if not text:
+        text = _collect_longform_text_via_dom(page)
+    if not text:
+        text = _collect_jsonld_article_text(page)
+    if not text:
         try:
-            page.close()
+            meta_desc = _clean(
+                page.locator('meta[property="og:description"]').first.get_attribute("content") or ""
+            )
+            if len(meta_desc) >= 20:
+                text = meta_desc
         except Exception:
             pass
+    item["text"] = text
+    if len(text) >= 20:
+        item["status"] = "ok"
+        return
+
+    # X article pages may require login even when status card is visible.
+    if "/login" in page.url or "/i/flow/" in page.url:
+        item["status"] = "login_required"
+        return
+
+    login_like = (
+        page.locator('a[href="/login"]').count() > 0
+        or page.locator('a[href*="/signup"]').count() > 0
+        or "log in" in (page.content() or "").lower()
+    )
+    if login_like:
+        item["status"] = "login_required"
+    elif _clean(item.get("title", "")).lower() == "x":
+        item["status"] = "access_limited"
+    else:
+        item["status"] = "no_text"
 
 
-def _status_from_time_permalink(article) -> Tuple[str, str]:
-    try:
-        t = article.locator("time").first
-        if t.count() == 0:
-            return "", ""
-        a = t.locator("xpath=ancestor::a[1]").first
-        if a.count() == 0:
-            return "", ""
-        href = a.get_attribute("href") or ""
-        sid = _extract_status_id(href)
-        return sid, href
-    except Exception:
-        return "", ""
+def _extract_long_articles(context, urls: List[str], timeout_ms: int, pool_size: int = 3) -> List[Dict[str, str]]:
+    """Fetch long-form articles on up to pool_size concurrent pages, keeping input order.
 
+    Navigations are started with ``wait_until="commit"`` so the browser loads queued
+    articles in the background while earlier ones are being read.
+    """
+    items = [_new_article_item(u) for u in urls]
+    pending = deque(range(len(urls)))
+    in_flight: Deque[Tuple[int, object]] = deque()
+    pool_size = max(1, pool_size)
 
-def _extract_article(article) -> Dict[str, str]:
-    text_parts: List[str] = []
-    seen_text: Set[str] = set()
+    def _close(page) -> None:
+        try:
+            page.close()
+        except Exception:
+            pass
 
-    def _append_text_from_selector(sel: str, limit: int = 600) -> None:
-        nodes = article.locator(sel)
-        count = min(nodes.count(), limit)
-        for i in range(count):
-            part = _clean(nodes.nth(i).inner_text())
-            if not part:
+    def _fill() -> None:
+        while pending and len(in_flight) < pool_size:
+            idx = pending.popleft()
+            page = context.new_page()
+            try:
+                x_rate_limit.acquire()
+                page.goto(urls[idx], wait_until="commit", timeout=timeout_ms)
+            except PlaywrightTimeoutError:
+                items[idx]["status"] = "timeout"
+                _close(page)
                 continue
-            if part in seen_text:
+            except Exception:
+                items[idx]["status"] = "error"
+                _close(page)
                 continue
-            seen_text.add(part)
-            text_parts.append(part)
+            in_flight.append((idx, page))
 
-    # Standard tweet text.
-    _append_text_from_selector('[data-testid="tweetText"]')
+    _fill()
+    while in_flight:
+        idx, page = in_flight.popleft()
+        try:
+            _read_long_article(page, items[idx], timeout_ms)
+        except PlaywrightTimeoutError:
+            items[idx]["status"] = "timeout"
+        except Exception:
+            items[idx]["status"] = "error"
+        finally:
+            _close(page)
+        _fill()
+    return items
 
-    # X article mode content blocks rendered directly in status page.
-    longform_selectors = [
-        "[class*='longform-header-one']",
-        "[class*='longform-header-two']",
-        "[class*='longform-unstyled']",
-        "[class*='longform-blockquote']",
-        "[class*='longform-unordered-list-item']",
-        "[class*='longform-ordered-list-item']",
-        "div[data-contents='true'] [data-block='true']",
-    ]
-    for sel in longform_selectors:
-        _append_text_from_selector(sel)
 
-    text = "\n".join(text_parts).strip()
+def _extract_long_article(context, url: str, timeout_ms: int) -> Dict[str, str]:
+    return _extract_long_articles(context, [url], timeout_ms, pool_size=1)[0]
 
-    user_text = ""
-    author_handle = ""
-    try:
-        user_name = article.locator('div[data-testid="User-Name"]').first
-        if user_name.count() > 0:
-            user_text = _clean(user_name.inner_text())
-            author_handle = _extract_handle(user_text)
-    except Exception:
-        pass
 
-    timestamp = ""
-    try:
-        t = article.locator("time").first
-        if t.count() > 0:
-            timestamp = t.get_attribute("datetime") or ""
-    except Exception:
-        pass
+def _status_from_time_permalink(payload: Dict) -> Tuple[str, str]:
+    href = payload.get("permalink", "")
+    sid = _extract_status_id(href)
+    if not sid:
+        return "", ""
+    return sid, href
+
+
+def _article_from_payload(payload: Dict) -> Dict[str, str]:
+    text_parts: List[str] = []
+    seen_text: Set[str] = set()
+    for raw in payload.get("texts", []):
+        part = _clean(raw)
+        if not part:
+            continue
+        if part in seen_text:
+            continue
+        seen_text.add(part)
+        text_parts.append(part)
+
+    text = "\n".join(text_parts).strip()
+
+    user_text = _clean(payload.get("user", ""))
+    author_handle = _extract_handle(user_text)
+    timestamp = payload.get("timestamp", "")
 
     # Prefer timestamp permalink, because tweet body may contain many /status/ links.
-    status_id, status_path = _status_from_time_permalink(article)
+    status_id, status_path = _status_from_time_permalink(payload)
     if not status_id:
-        links = _article_status_links(article)
+        links = _article_status_links(payload)
         status_id = links[0][0] if links else ""
         status_path = links[0][1] if links else ""
     status_url = ""
@@ -471,43 +558,85 @@ def _extract_article(article) -> Dict[str, str]:
         "author_handle": author_handle,
         "timestamp": timestamp,
         "text": text,
-        "media_urls": _extract_media(article),
-        "article_urls": _extract_article_links(article),
+        "media_urls": _extract_media(payload),
+        "article_urls": _extract_article_links(payload),
     }
 
 
-def _find_target_article(page, status_id: str):
-    articles = page.locator("main article")
-    count = articles.count()
-    if count == 0:
+def _article_payloads(page, limit: int) -> List[Dict]:
+    return page.locator("main article").evaluate_all(ARTICLES_PAYLOAD_JS, limit)
+
+
+def _find_target_article(page, status_id: str) -> Dict:
+    """Payload of the target article, from the same snapshot used to match it."""
+    payloads = _article_payloads(page, 1000)
+    if not payloads:
         raise RuntimeError("No tweet article found on page")
 
     if not status_id:
-        return articles.first
+        return payloads[0]
 
     # Prefer exact match on time permalink status id.
-    for i in range(count):
-        art = articles.nth(i)
-        sid, _ = _status_from_time_permalink(art)
+    for payload in payloads:
+        sid, _ = _status_from_time_permalink(payload)
         if sid and sid == status_id:
-            return art
+            return payload
 
     # Fallback: any status link inside article.
-    for i in range(count):
-        art = articles.nth(i)
-        links = _article_status_links(art)
+    for payload in payloads:
+        links = _article_status_links(payload)
         if any(link_sid == status_id for link_sid, _ in links):
-            return art
+            return payload
 
     raise RuntimeError(f"Target status id not found on page: {status_id}")
 
 
-def _find_target_article_with_retries(page, status_id: str):
+# Permalinks of mounted timeline articles; changes whenever the virtualized list mounts new posts.
+ARTICLE_SIGNATURE_JS = """() => Array.from(
+    document.querySelectorAll("main article time"),
+    (t) => { const a = t.closest("a"); return a ? a.getAttribute("href") || "" : ""; },
+).join("|")"""
+
+# Scroll synchronously and report the new signature plus whether the viewport actually moved.
+SCROLL_JS = (
+    "(dy) => { const before = window.scrollY; window.scrollBy(0, dy); "
+    "return { moved: window.scrollY !== before, signature: ("
+    + ARTICLE_SIGNATURE_JS
+    + ")() }; }"
+)
+
+
+def _wait_for_articles_change(page, previous: str, timeout_ms: int) -> bool:
+    """Block until the mounted article set differs from previous (DOM mutation), up to timeout_ms."""
+    try:
+        page.wait_for_function(
+            "(prev) => (" + ARTICLE_SIGNATURE_JS + ")() !== prev",
+            arg=previous,
+            timeout=timeout_ms,
+            polling="mutation",
+        )
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+def _scroll_for_articles(page, dy: int, timeout_ms: int) -> bool:
+    """Scroll by dy and wait for newly mounted articles. False when nothing new can appear."""
+    previous = page.evaluate(ARTICLE_SIGNATURE_JS)
+    state = page.evaluate(SCROLL_JS, dy)
+    if state.get("signature") != previous:
+        return True
+    if not state.get("moved"):
+        # Already at the bottom and nothing mounted: no point waiting.
+        return False
+    return _wait_for_articles_change(page, previous, timeout_ms)
+
+
+def _find_target_article_with_retries(page, status_id: str) -> Dict:
     # X timeline is virtualized. The target post may be unmounted after scrolling.
     attempts = 8
     try:
-        page.keyboard.press("Home")
-        page.wait_for_timeout(500)
+        page.evaluate("() => window.scrollTo(0, 0)")
     except Exception:
         pass
 
@@ -520,8 +649,8 @@ def _find_target_article_with_retries(page, status_id: str):
             if i == attempts - 1:
                 break
             try:
-                page.mouse.wheel(0, 1200)
-                page.wait_for_timeout(700)
+                if not _scroll_for_articles(page, 1200, 700):
+                    break
             except Exception:
                 pass
 
@@ -530,14 +659,23 @@ def _find_target_article_with_retries(page, status_id: str):
     raise RuntimeError(f"Target status id not found on page: {status_id}")
 
 
-def _collect_articles(page, max_articles: int) -> List[Dict[str, str]]:
-    items: List[Dict[str, str]] = []
-    seen_ids: Set[str] = set()
-
-    articles = page.locator("main article")
-    count = min(articles.count(), max_articles)
-    for i in range(count):
-        data = _extract_article(articles.nth(i))
+def _merge_article_payloads(
+    items: List[Dict[str, str]],
+    seen_ids: Set[str],
+    seen_texts: Set[str],
+    payloads: List[Dict],
+    max_articles: int,
+) -> int:
+    """Append not-yet-seen articles from payloads to items; returns how many new status ids were added.
+
+    Articles without a status id are deduplicated by text. They never count as new, so a node that
+    stays mounted across scrolls cannot keep the harvest going.
+    """
+    new_ids = 0
+    for payload in payloads:
+        if len(items) >= max_articles:
+            break
+        data = _article_from_payload(payload)
         sid = data.get("status_id", "")
         text = data.get("text", "")
 
@@ -545,15 +683,92 @@ def _collect_articles(page, max_articles: int) -> List[Dict[str, str]]:
             if sid in seen_ids:
                 continue
             seen_ids.add(sid)
+            new_ids += 1
         else:
-            # Skip empty nodes without id.
-            if not text:
+            # Skip empty nodes without id, and ones already harvested on an earlier pass.
+            if not text or text in seen_texts:
                 continue
+            seen_texts.add(text)
 
         items.append(data)
+    return new_ids
+
+
+def _harvest_thread_articles(page, main_post: Dict, args) -> List[Dict[str, str]]:
+    """Scroll the conversation and harvest articles as they mount.
+
+    Harvesting after every scroll keeps posts that the virtualized timeline unmounts later.
+    Stops when a scroll mounts no new status, when ``--max-thread`` thread posts are in hand,
+    or after ``--scrolls`` scrolls.
+    """
+    items: List[Dict[str, str]] = []
+    seen_ids: Set[str] = set()
+    seen_texts: Set[str] = set()
+    main_sid = main_post.get("status_id", "")
+    target_handle = (main_post.get("author_handle") or "").lower()
+
+    def _thread_count() -> int:
+        count = 0
+        for item in items:
+            if main_sid and item.get("status_id") == main_sid:
+                continue
+            if not args.include_others and target_handle:
+                if (item.get("author_handle") or "").lower() != target_handle:
+                    continue
+            if item.get("text"):
+                count += 1
+        return count
+
+    _merge_article_payloads(items, seen_ids, seen_texts, _article_payloads(page, 1000), args.max_articles)
+    for _ in range(max(0, args.scrolls)):
+        if len(items) >= args.max_articles or _thread_count() >= args.max_thread:
+            break
+        if not _scroll_for_articles(page, 2800, args.scroll_wait_ms):
+            break
+        payloads = _article_payloads(page, 1000)
+        if not _merge_article_payloads(items, seen_ids, seen_texts, payloads, args.max_articles):
+            break
     return items
 
 
+class TweetDetailRecorder:
+    """Keeps the TweetDetail GraphQL responses a page receives while it loads a status."""
+
+    def __init__(self, page) -> None:
+        self.responses: List[object] = []
+        page.on("response", self._on_response)
+
+    def _on_response(self, response) -> None:
+        if is_tweet_detail_url(response.url):
+            self.responses.append(response)
+
+    def reset(self) -> None:
+        self.responses.clear()
+
+    def payloads(self) -> List[Dict]:
+        out: List[Dict] = []
+        for response in self.responses:
+            try:
+                if response.ok:
+                    out.append(response.json())
+            except Exception:
+                continue
+        return out
+
+
+def _capture_from_graphql(recorder: TweetDetailRecorder, status_id: str, max_articles: int):
+    """Main post and conversation items from intercepted payloads, or None to fall back to the DOM."""
+    items = items_from_payloads(recorder.payloads())
+    if not items:
+        return None
+    main_post = next((it for it in items if it.get("status_id") == status_id), None)
+    if main_post is None:
+        if status_id:
+            return None
+        main_post = items[0]
+    return main_post, items[:max_articles]
+
+
 def _render_markdown(result: Dict) -> str:
     lines: List[str] = []
     lines.append(f"# X Capture {result.get('target_status_id', '')}")
@@ -635,121 +850,562 @@ def _render_markdown(result: Dict) -> str:
     return "\n".join(lines)
 
 
-def main() -> None:
+# Hosts/paths that only serve analytics or ads; blocked under the "tracking" lean type.
+TRACKING_MARKERS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "ads-twitter.com",
+    "ads-api.x.com",
+    "analytics.twitter.com",
+    "/jot/",
+    "/client_event",
+)
+# CDP Network.setBlockedURLs patterns per lean type ("*" is the only wildcard).
+LEAN_BLOCK_PATTERNS: Dict[str, List[str]] = {
+    "image": [
+        "*pbs.twimg.com/media/*",
+        "*pbs.twimg.com/profile_images/*",
+        "*pbs.twimg.com/profile_banners/*",
+        "*pbs.twimg.com/card_img/*",
+        "*pbs.twimg.com/ext_tw_video_thumb/*",
+        "*pbs.twimg.com/amplify_video_thumb/*",
+        "*format=jpg*",
+        "*format=png*",
+        "*format=webp*",
+        "*.jpg*",
+        "*.jpeg*",
+        "*.png*",
+        "*.gif*",
+        "*.webp*",
+    ],
+    "media": ["*video.twimg.com/*", "*.mp4*", "*.m3u8*", "*.m4s*", "*.webm*"],
+    "font": ["*.woff*", "*.ttf*", "*.otf*"],
+    "stylesheet": ["*.css*"],
+    "tracking": [f"*{m}*" for m in TRACKING_MARKERS],
+}
+LEAN_DEFAULT_BLOCK = "image,media,font,tracking"
+
+
+def _parse_block_types(raw: str) -> Set[str]:
+    return {part.strip().lower() for part in (raw or "").split(",") if part.strip()}
+
+
+def _install_lean_blocking(context, block_types: Set[str]) -> None:
+    """Block URLs of resource types capture never reads, in the browser itself.
+
+    The patterns go to each page's CDP session, so no request waits on a Python route handler (which
+    would stall pages while Python sleeps in x_rate_limit or downloads media). Media URLs still come
+    from img/video attributes and GraphQL payloads; only the bytes are skipped.
+    """
+    patterns: List[str] = []
+    for kind in sorted(block_types):
+        patterns.extend(LEAN_BLOCK_PATTERNS.get(kind, []))
+    if not patterns:
+        return
+
+    def _block(page) -> None:
+        try:
+            session = context.new_cdp_session(page)
+            session.send("Network.enable")
+            session.send("Network.setBlockedURLs", {"urls": patterns})
+        except Exception as exc:
+            print(f"Lean mode: could not block URLs on a page: {exc}")
+
+    for page in context.pages:
+        _block(page)
+    context.on("page", _block)
+
+
+def _launch_context(p, args):
+    channel = None
+    if args.browser == "chrome":
+        channel = "chrome"
+    elif args.browser == "edge":
+        channel = "msedge"
+
+    launch_kwargs = {
+        "user_data_dir": str(PROFILE_DIR),
+        "channel": channel,
+        "headless": args.headless,
+    }
+    if args.proxy.strip():
+        launch_kwargs["proxy"] = {"server": args.proxy.strip()}
+    if args.lean:
+        # x.com's service worker fetches outside the page's network session and would bypass blocking.
+        launch_kwargs["service_workers"] = "block"
+
+    context = p.chromium.launch_persistent_context(
+        **launch_kwargs,
+    )
+    x_rate_limit.watch(context)
+
+    cookie_injected = _inject_x_cookies(context, cookie_string=args.cookie_string, cookie_file=args.cookie_file)
+    if cookie_injected:
+        print("Cookie mode enabled (auth cookies injected).")
+    if args.lean:
+        block_types = _parse_block_types(args.lean_block)
+        unknown = block_types - set(LEAN_BLOCK_PATTERNS)
+        if unknown:
+            print(f"Lean mode: ignoring unknown block types: {', '.join(sorted(unknown))}")
+            block_types -= unknown
+        _install_lean_blocking(context, block_types)
+        print(f"Lean mode enabled (blocking: {', '.join(sorted(block_types))}).")
+    return context
+
+
+def _manual_login(page, timeout_ms: int) -> None:
+    print("Manual login mode: opening X login page...")
+    page.goto("https://x.com/i/flow/login", wait_until="domcontentloaded", timeout=timeout_ms)
+    print(
+        "Please finish login in browser.\n"
+        "After login succeeds and homepage/feed is visible, press Enter to continue capture..."
+    )
+    try:
+        input()
+    except EOFError:
+        pass
+
+
+def _save_debug(page, prefix: str) -> Tuple[Path, Path]:
+    DEBUG_DIR.mkdir(parents=True, exist_ok=True)
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    shot = DEBUG_DIR / f"{prefix}_{ts}.png"
+    html = DEBUG_DIR / f"{prefix}_{ts}.html"
+    try:
+        page.screenshot(path=str(shot), full_page=True)
+        html.write_text(page.content(), encoding="utf-8")
+    except Exception:
+        pass
+    return shot, html
+
+
+def _capture_loaded_page(
+    context, page, url: str, args, recorder: Optional[TweetDetailRecorder] = None
+) -> Tuple[Dict, List[Dict], List[Dict], str]:
+    """Extract main post, scanned articles and long articles from a page already navigated to url.
+
+    With ``--backend graphql`` the conversation comes from TweetDetail payloads the recorder saw;
+    the DOM scroll-and-scan path only runs when no usable payload arrived.
+    """
+    target_status_id = _extract_status_id(url)
+    if "/i/flow/login" in page.url:
+        x_rate_limit.throttled("login wall")
+        raise NotLoggedInError("Not logged in. Please log in X in the opened browser, then rerun.")
+
+    page.wait_for_selector("main", timeout=args.timeout)
+
+    page.wait_for_selector("main article", timeout=args.timeout)
+
+    captured = None
+    if recorder is not None and args.backend == "graphql":
+        captured = _capture_from_graphql(recorder, target_status_id, args.max_articles)
+    if captured is not None:
+        main_post, all_articles = captured
+        backend = "graphql"
+    else:
+        main_post = _article_from_payload(_find_target_article_with_retries(page, target_status_id))
+        if target_status_id and main_post.get("status_id") and main_post.get("status_id") != target_status_id:
+            raise RuntimeError(
+                f"Captured status mismatch: expected={target_status_id}, actual={main_post.get('status_id')}"
+            )
+
+        all_articles = _harvest_thread_articles(page, main_post, args)
+        backend = "dom"
+    # Extract linked long-form article content when available.
+    article_urls: List[str] = []
+    seen_article_urls: Set[str] = set()
+    for u in main_post.get("article_urls", []):
+        if u and u not in seen_article_urls:
+            seen_article_urls.add(u)
+            article_urls.append(u)
+    for node in all_articles:
+        for u in node.get("article_urls", []):
+            if u and u not in seen_article_urls:
+                seen_article_urls.add(u)
+                article_urls.append(u)
+
+    long_articles = _extract_long_articles(
+        context,
+        article_urls,
+        args.article_timeout or args.timeout,
+        pool_size=args.article_pages,
+    )
+    limited = [a.get("status") for a in long_articles if a.get("status") in x_rate_limit.THROTTLE_ARTICLE_STATUSES]
+    if limited:
+        x_rate_limit.throttled(f"article {limited[0]}")
+    else:
+        x_rate_limit.succeeded()
+
+    # Fallback: if article page is access-limited but status page already has longform blocks,
+    # preserve the extracted content from main post.
+    if main_post.get("article_urls") and len((main_post.get("text") or "")) >= 120:
+        for item in long_articles:
+            if item.get("status") in {"no_text", "access_limited", "login_required"} and not item.get("text"):
+                item["text"] = main_post.get("text", "")
+                item["status"] = "from_status_page"
+    return main_post, all_articles, long_articles, backend
+
+
+def _build_result(
+    url: str, main_post: Dict, all_articles: List[Dict], long_articles: List[Dict], args, backend: str = "dom"
+) -> Dict:
+    target_status_id = _extract_status_id(url)
+    main_sid = main_post.get("status_id", "")
+    if not target_status_id:
+        target_status_id = main_sid
+
+    target_handle = (main_post.get("author_handle") or "").lower()
+    thread: List[Dict[str, str]] = []
+    for item in all_articles:
+        sid = item.get("status_id", "")
+        if sid and main_sid and sid == main_sid:
+            continue
+
+        if not args.include_others and target_handle:
+            if (item.get("author_handle") or "").lower() != target_handle:
+                continue
+
+        if not item.get("text"):
+            continue
+
+        thread.append(item)
+        if len(thread) >= args.max_thread:
+            break
+
+    captured_at = datetime.now(timezone.utc).isoformat()
+    return {
+        "url": url,
+        "target_status_id": target_status_id,
+        "captured_at": captured_at,
+        "main": main_post,
+        "thread": thread,
+        "thread_count": len(thread),
+        "scan_count": len(all_articles),
+        "articles": long_articles,
+        "article_count": len(long_articles),
+        "capture_backend": backend,
+    }
+
+
+def _download_media(result: Dict, media_dir: Path, workers: int = 4) -> None:
+    all_media: List[str] = []
+    all_media.extend(result.get("main", {}).get("media_urls", []))
+    for item in result.get("thread", []):
+        all_media.extend(item.get("media_urls", []))
+
+    unique_media: List[str] = []
+    seen_media: Set[str] = set()
+    for u in all_media:
+        if not u or u in seen_media:
+            continue
+        seen_media.add(u)
+        unique_media.append(u)
+
+    # Blobs are shared across captures, so an image seen in an earlier post is not fetched again.
+    downloaded = download_all(unique_media, MediaStore(media_dir), workers=workers)
+    result["downloaded_media"] = downloaded
+    result["downloaded_media_count"] = len(downloaded)
+
+
+def _write_capture(result: Dict, output_dir: str, output: str = "") -> Path:
+    output_json = json.dumps(result, ensure_ascii=False, indent=2)
+
+    if output:
+        out = Path(output)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(output_json + "\n", encoding="utf-8")
+
+    out_dir = Path(output_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    name = result.get("target_status_id") or datetime.now().strftime("capture_%Y%m%d_%H%M%S")
+    json_path = out_dir / f"{name}.json"
+    md_path = out_dir / f"{name}.md"
+
+    json_path.write_text(output_json + "\n", encoding="utf-8")
+    md_path.write_text(_render_markdown(result), encoding="utf-8")
+    try:
+        capture_index.index_capture(result, json_path)
+    except sqlite3.Error as exc:
+        # The JSON files stay the source of truth; `capture_index.py rebuild` can catch up later.
+        print(f"Capture index update failed: {exc}")
+    return json_path
+
+
+def _finish_capture(result: Dict, args) -> Path:
+    if args.download_media:
+        _download_media(result, Path(args.media_dir), args.media_workers)
+    return _write_capture(result, args.output_dir)
+
+
+def _load_batch_urls(urls_file: str) -> List[str]:
+    if urls_file == "-":
+        raw_lines = sys.stdin.read().splitlines()
+    else:
+        raw_lines = Path(urls_file).read_text(encoding="utf-8").splitlines()
+
+    urls: List[str] = []
+    seen: Set[str] = set()
+    for raw in raw_lines:
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line in seen:
+            continue
+        seen.add(line)
+        urls.append(line)
+    return urls
+
+
+def _run_batch(context, urls: List[str], args) -> List[Dict]:
+    """Capture many statuses in one browser context.
+
+    Up to ``--pool-size`` pages navigate ahead in the background (``goto`` returns on commit),
+    while captures are finished in input order. Each capture is written as soon as it completes.
+    """
+    summary: List[Dict] = []
+    pending = deque(urls)
+    free_pages = []
+    for _ in range(max(1, min(args.pool_size, len(urls)))):
+        page = context.new_page()
+        free_pages.append((page, TweetDetailRecorder(page)))
+    in_flight: Deque[Tuple[object, TweetDetailRecorder, str]] = deque()
+
+    def _record_failure(url: str, exc: Exception, page=None) -> None:
+        entry = {"url": url, "status_id": _extract_status_id(url), "ok": False, "error": str(exc) or type(exc).__name__}
+        if page is not None:
+            shot, html = _save_debug(page, "batch_error")
+            entry["debug"] = [str(shot), str(html)]
+        print(f"Failed {url}: {entry['error']}")
+        summary.append(entry)
+
+    def _fill() -> None:
+        while free_pages and pending:
+            page, recorder = free_pages.pop()
+            url = pending.popleft()
+            recorder.reset()
+            try:
+                x_rate_limit.acquire()
+                page.goto(url, wait_until="commit", timeout=args.timeout)
+            except Exception as exc:
+                _record_failure(url, exc)
+                free_pages.append((page, recorder))
+                continue
+            in_flight.append((page, recorder, url))
+
+    _fill()
+    while in_flight:
+        page, recorder, url = in_flight.popleft()
+        try:
+            page.bring_to_front()
+            page.wait_for_load_state("domcontentloaded", timeout=args.timeout)
+            main_post, all_articles, long_articles, backend = _capture_loaded_page(context, page, url, args, recorder)
+            result = _build_result(url, main_post, all_articles, long_articles, args, backend)
+            json_path = _finish_capture(result, args)
+            print(f"Captured {result.get('target_status_id', '')} -> {json_path}")
+            summary.append(
+                {
+                    "url": url,
+                    "status_id": result.get("target_status_id", ""),
+                    "ok": True,
+                    "json": str(json_path),
+                    "thread_count": result.get("thread_count", 0),
+                    "article_count": result.get("article_count", 0),
+                }
+            )
+        except NotLoggedInError:
+            raise
+        except Exception as exc:
+            _record_failure(url, exc, page)
+        free_pages.append((page, recorder))
+        _fill()
+
+    return summary
+
+
+def capture_url(context, url: str, args) -> Dict:
+    """Capture one status on a fresh page of a long-lived context and write its files."""
+    page = context.new_page()
+    recorder = TweetDetailRecorder(page)
+    try:
+        x_rate_limit.acquire()
+        page.goto(url, wait_until="domcontentloaded", timeout=args.timeout)
+        main_post, all_articles, long_articles, backend = _capture_loaded_page(context, page, url, args, recorder)
+        result = _build_result(url, main_post, all_articles, long_articles, args, backend)
+        _finish_capture(result, args)
+        return result
+    except NotLoggedInError:
+        raise
+    except Exception:
+        _save_debug(page, "error")
+        raise
+    finally:
+        try:
+            page.close()
+        except Exception:
+            pass
+
+
+def capture(url: str, args) -> Dict:
+    """Launch a browser, capture one status and write its files; for in-process pipelines.
+
+    args is a parsed ``build_parser()`` namespace. Failures raise instead of exiting.
+    """
+    with sync_playwright() as p:
+        context = _launch_context(p, args)
+        try:
+            if args.manual_login and not args.headless:
+                login_page = context.new_page()
+                _manual_login(login_page, args.timeout)
+                login_page.close()
+            return capture_url(context, url, args)
+        finally:
+            context.close()
+
+
+def build_parser() -> argparse.ArgumentParser:
+
     parser = argparse.ArgumentParser(description="Capture one X post and thread text")
-    parser.add_argument("url", help="X post URL")
+    parser.add_argument("url", nargs="?", default="", help="X post URL")
+    parser.add_argument(
+        "--urls-file",
+        default="",
+        help="Batch mode: text file with one X URL per line ('-' reads stdin); reuses one browser context",
+    )
+    parser.add_argument("--pool-size", type=int, default=3, help="Batch mode: pages navigating concurrently")
     parser.add_argument("--browser", default="chromium", choices=["chrome", "edge", "chromium"])
     parser.add_argument("--headless", action="store_true")
     parser.add_argument("--manual-login", action="store_true", help="Pause to allow manual login in opened browser")
     parser.add_argument("--timeout", type=int, default=90000)
     parser.add_argument("--proxy", default="", help="Playwright proxy server, e.g. http://127.0.0.1:7890")
+    parser.add_argument("--lean", action="store_true", help="Block images, media, fonts and trackers while capturing")
+    parser.add_argument(
+        "--lean-block",
+        default=LEAN_DEFAULT_BLOCK,
+        help="Comma list of resource types to block in --lean mode: image, media, font, stylesheet, tracking",
+    )
     parser.add_argument("--cookie-string", default="", help="Raw cookie string from logged-in x.com session")
     parser.add_argument("--cookie-file", default="", help="Text file that stores one raw cookie string")
-    parser.add_argument("--scrolls", type=int, default=4)
-    parser.add_argument("--scroll-wait-ms", type=int, default=1200)
+    parser.add_argument(
+        "--backend",
+        default="graphql",
+        choices=["graphql", "dom"],
+        help="graphql: read TweetDetail responses (DOM fallback when none seen); dom: scroll and scrape only",
+    )
+    parser.add_argument("--scrolls", type=int, default=20, help="Upper bound; scrolling stops once nothing new mounts")
+    parser.add_argument("--scroll-wait-ms", type=int, default=1200, help="Max wait for new posts after each scroll")
     parser.add_argument("--max-articles", type=int, default=50)
     parser.add_argument("--max-thread", type=int, default=20)
+    parser.add_argument("--article-pages", type=int, default=3, help="Concurrent pages for long-form article fetches")
+    parser.add_argument("--article-timeout", type=int, default=0, help="Per-article timeout in ms (default: --timeout)")
     parser.add_argument("--include-others", action="store_true", help="Include non-author posts in thread output")
     parser.add_argument("--hold-on-fail", action="store_true", help="Keep browser open on failure for manual inspection")
     parser.add_argument("--download-media", action="store_true", help="Download media files to local directory")
     parser.add_argument("--media-dir", default=str(MEDIA_DIR), help="Directory for downloaded media")
+    parser.add_argument("--media-workers", type=int, default=4, help="Concurrent media downloads")
     parser.add_argument("--output", default="", help="Optional output JSON path")
     parser.add_argument("--output-dir", default=str(CAPTURE_DIR), help="Capture directory for auto files")
-    args = parser.parse_args()
+    parser.add_argument(
+        "--skip-fresh",
+        action="store_true",
+        help="Reuse an existing capture that is ok and younger than --cache-ttl-hours instead of recapturing",
+    )
+    parser.add_argument(
+        "--cache-ttl-hours",
+        type=float,
+        default=capture_index.DEFAULT_TTL_HOURS,
+        help="Freshness window for --skip-fresh; 0 means no age limit (env X_CAPTURE_TTL_HOURS)",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Submit to the running capture daemon (scripts/capture_daemon.py); capture locally if it is down",
+    )
+    return parser
 
-    channel = None
-    if args.browser == "chrome":
-        channel = "chrome"
-    elif args.browser == "edge":
-        channel = "msedge"
 
-    target_status_id = _extract_status_id(args.url)
+def main() -> None:
+    parser = build_parser()
+    args = parser.parse_args()
 
-    with sync_playwright() as p:
-        launch_kwargs = {
-            "user_data_dir": str(PROFILE_DIR),
-            "channel": channel,
-            "headless": args.headless,
-        }
-        if args.proxy.strip():
-            launch_kwargs["proxy"] = {"server": args.proxy.strip()}
+    if not args.url and not args.urls_file:
+        parser.error("provide an X post URL or --urls-file")
+    if args.url and args.urls_file:
+        parser.error("use either a single URL or --urls-file, not both")
+
+    if args.skip_fresh and args.url:
+        sid = _extract_status_id(args.url)
+        if capture_index.is_fresh(sid, args.cache_ttl_hours, Path(args.output_dir)):
+            output_json = (Path(args.output_dir) / f"{sid}.json").read_text(encoding="utf-8").rstrip("\n")
+            print(output_json)
+            if args.output:
+                out = Path(args.output)
+                out.parent.mkdir(parents=True, exist_ok=True)
+                out.write_text(output_json + "\n", encoding="utf-8")
+            return
+
+    if args.daemon and args.url:
+        daemon = capture_client.daemon_url()
+        if capture_client.daemon_available(daemon):
+            result = capture_client.submit_capture(daemon, args.url, capture_client.job_options(args))
+            output_json = json.dumps(result, ensure_ascii=False, indent=2)
+            print(output_json)
+            if args.output:
+                out = Path(args.output)
+                out.parent.mkdir(parents=True, exist_ok=True)
+                out.write_text(output_json + "\n", encoding="utf-8")
+            return
+        print(f"Capture daemon not reachable at {daemon}; capturing locally.")
+
+    if args.urls_file:
+        urls = _load_batch_urls(args.urls_file)
+        if args.skip_fresh:
+            stale = [
+                u
+                for u in urls
+                if not capture_index.is_fresh(_extract_status_id(u), args.cache_ttl_hours, Path(args.output_dir))
+            ]
+            if len(stale) < len(urls):
+                print(f"Skipping {len(urls) - len(stale)} fresh capture(s).")
+            urls = stale
+        if not urls:
+            raise SystemExit("No URLs to capture.")
+        with sync_playwright() as p:
+            context = _launch_context(p, args)
+            if args.manual_login and not args.headless:
+                login_page = context.new_page()
+                _manual_login(login_page, args.timeout)
+                login_page.close()
+            try:
+                summary = _run_batch(context, urls, args)
+            except NotLoggedInError as exc:
+                context.close()
+                raise SystemExit(str(exc))
+            context.close()
 
-        context = p.chromium.launch_persistent_context(
-            **launch_kwargs,
-        )
+        ok = sum(1 for s in summary if s.get("ok"))
+        print(json.dumps({"urls": len(urls), "captured": ok, "failed": len(summary) - ok, "items": summary}, ensure_ascii=False, indent=2))
+        return
 
-        cookie_injected = _inject_x_cookies(context, cookie_string=args.cookie_string, cookie_file=args.cookie_file)
-        if cookie_injected:
-            print("Cookie mode enabled (auth cookies injected).")
+    with sync_playwright() as p:
+        context = _launch_context(p, args)
 
         page = context.new_page()
+        recorder = TweetDetailRecorder(page)
         try:
             if args.manual_login and not args.headless:
-                print("Manual login mode: opening X login page...")
-                page.goto("https://x.com/i/flow/login", wait_until="domcontentloaded", timeout=args.timeout)
-                print(
-                    "Please finish login in browser.\n"
-                    "After login succeeds and homepage/feed is visible, press Enter to continue capture..."
-                )
-                try:
-                    input()
-                except EOFError:
-                    pass
+                _manual_login(page, args.timeout)
+                recorder.reset()
+            x_rate_limit.acquire()
             page.goto(args.url, wait_until="domcontentloaded", timeout=args.timeout)
-            if "/i/flow/login" in page.url:
-                context.close()
-                raise SystemExit("Not logged in. Please log in X in the opened browser, then rerun.")
-
-            page.wait_for_selector("main", timeout=args.timeout)
-
-            page.wait_for_selector("main article", timeout=args.timeout)
-
-            target_article = _find_target_article_with_retries(page, target_status_id)
-            main_post = _extract_article(target_article)
-            if target_status_id and main_post.get("status_id") and main_post.get("status_id") != target_status_id:
-                raise RuntimeError(
-                    f"Captured status mismatch: expected={target_status_id}, actual={main_post.get('status_id')}"
-                )
-
-            for _ in range(max(0, args.scrolls)):
-                page.mouse.wheel(0, 2800)
-                page.wait_for_timeout(args.scroll_wait_ms)
-
-            all_articles = _collect_articles(page, max_articles=args.max_articles)
-            # Extract linked long-form article content when available.
-            article_urls: List[str] = []
-            seen_article_urls: Set[str] = set()
-            for u in main_post.get("article_urls", []):
-                if u and u not in seen_article_urls:
-                    seen_article_urls.add(u)
-                    article_urls.append(u)
-            for node in all_articles:
-                for u in node.get("article_urls", []):
-                    if u and u not in seen_article_urls:
-                        seen_article_urls.add(u)
-                        article_urls.append(u)
-
-            long_articles: List[Dict[str, str]] = []
-            for u in article_urls:
-                long_articles.append(_extract_long_article(context, u, args.timeout))
-
-            # Fallback: if article page is access-limited but status page already has longform blocks,
-            # preserve the extracted content from main post.
-            if main_post.get("article_urls") and len((main_post.get("text") or "")) >= 120:
-                for item in long_articles:
-                    if item.get("status") in {"no_text", "access_limited", "login_required"} and not item.get("text"):
-                        item["text"] = main_post.get("text", "")
-                        item["status"] = "from_status_page"
+            main_post, all_articles, long_articles, backend = _capture_loaded_page(
+                context, page, args.url, args, recorder
+            )
+        except NotLoggedInError as exc:
+            context.close()
+            raise SystemExit(str(exc))
         except PlaywrightTimeoutError:
-            DEBUG_DIR.mkdir(parents=True, exist_ok=True)
-            ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-            shot = DEBUG_DIR / f"timeout_{ts}.png"
-            html = DEBUG_DIR / f"timeout_{ts}.html"
-            try:
-                page.screenshot(path=str(shot), full_page=True)
-                html.write_text(page.content(), encoding="utf-8")
-            except Exception:
-                pass
+            shot, html = _save_debug(page, "timeout")
             current = page.url
             if args.hold_on_fail:
                 print(
@@ -766,16 +1422,8 @@ def main() -> None:
                 f"Debug saved to {shot} and {html}."
             )
         except Exception as exc:
-            DEBUG_DIR.mkdir(parents=True, exist_ok=True)
-            ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-            shot = DEBUG_DIR / f"error_{ts}.png"
-            html = DEBUG_DIR / f"error_{ts}.html"
             current = page.url
-            try:
-                page.screenshot(path=str(shot), full_page=True)
-                html.write_text(page.content(), encoding="utf-8")
-            except Exception:
-                pass
+            shot, html = _save_debug(page, "error")
             if args.hold_on_fail:
                 print(
                     "Capture failed. Browser is kept open for inspection.\n"
@@ -797,95 +1445,13 @@ def main() -> None:
 
         context.close()
 
-    main_sid = main_post.get("status_id", "")
-    if not target_status_id:
-        target_status_id = main_sid
-
-    target_handle = (main_post.get("author_handle") or "").lower()
-    thread: List[Dict[str, str]] = []
-    for item in all_articles:
-        sid = item.get("status_id", "")
-        if sid and main_sid and sid == main_sid:
-            continue
-
-        if not args.include_others and target_handle:
-            if (item.get("author_handle") or "").lower() != target_handle:
-                continue
-
-        if not item.get("text"):
-            continue
-
-        thread.append(item)
-        if len(thread) >= args.max_thread:
-            break
-
-    captured_at = datetime.now(timezone.utc).isoformat()
-    result = {
-        "url": args.url,
-        "target_status_id": target_status_id,
-        "captured_at": captured_at,
-        "main": main_post,
-        "thread": thread,
-        "thread_count": len(thread),
-        "scan_count": len(all_articles),
-        "articles": long_articles,
-        "article_count": len(long_articles),
-    }
+    result = _build_result(args.url, main_post, all_articles, long_articles, args, backend)
 
     if args.download_media:
-        media_dir = Path(args.media_dir)
-        media_dir.mkdir(parents=True, exist_ok=True)
-        downloaded: List[str] = []
-        all_media: List[str] = []
-        all_media.extend(main_post.get("media_urls", []))
-        for item in thread:
-            all_media.extend(item.get("media_urls", []))
-
-        unique_media: List[str] = []
-        seen_media: Set[str] = set()
-        for u in all_media:
-            if not u or u in seen_media:
-                continue
-            seen_media.add(u)
-            unique_media.append(u)
-
-        for idx, url in enumerate(unique_media, 1):
-            parsed = urlparse(url)
-            qs = parse_qs(parsed.query)
-            ext = qs.get("format", ["jpg"])[0] or "jpg"
-            file_name = f"{target_status_id or 'capture'}_{idx:02d}.{ext}"
-            out_path = media_dir / file_name
-            try:
-                r = requests.get(
-                    url,
-                    timeout=30,
-                    headers={"User-Agent": "Mozilla/5.0"},
-                )
-                r.raise_for_status()
-                out_path.write_bytes(r.content)
-                downloaded.append(str(out_path))
-            except Exception:
-                continue
-
-        result["downloaded_media"] = downloaded
-        result["downloaded_media_count"] = len(downloaded)
+        _download_media(result, Path(args.media_dir), args.media_workers)
 
-    output_json = json.dumps(result, ensure_ascii=False, indent=2)
-    print(output_json)
-
-    if args.output:
-        out = Path(args.output)
-        out.parent.mkdir(parents=True, exist_ok=True)
-        out.write_text(output_json + "\n", encoding="utf-8")
-
-    out_dir = Path(args.output_dir)
-    out_dir.mkdir(parents=True, exist_ok=True)
-    name = target_status_id or datetime.now().strftime("capture_%Y%m%d_%H%M%S")
-    json_path = out_dir / f"{name}.json"
-    md_path = out_dir / f"{name}.md"
-
-    json_path.write_text(output_json + "\n", encoding="utf-8")
-    md_path.write_text(_render_markdown(result), encoding="utf-8")
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    _write_capture(result, args.output_dir, args.output)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import html
+import re
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Set
+
+# GraphQL operations whose payloads carry the conversation around one status.
+TWEET_DETAIL_OPERATIONS = ("TweetDetail", "TweetResultByRestId")
+
+
+def _clean(text: str) -> str:
+    return re.sub(r"\s+", " ", (text or "")).strip()
+
+
+def is_tweet_detail_url(url: str) -> bool:
+    if "/graphql/" not in (url or ""):
+        return False
+    return any(f"/{op}" in url for op in TWEET_DETAIL_OPERATIONS)
+
+
+def _iter_tweet_results(obj: object) -> Iterator[Dict]:
+    # Depth-first in document order, so timeline entries keep their on-page order.
+    # Does not descend into a found tweet: quoted tweets are not part of the thread.
+    stack: List[object] = [obj]
+    while stack:
+        cur = stack.pop()
+        if isinstance(cur, dict):
+            found = cur.get("tweet_results")
+            if isinstance(found, dict) and isinstance(found.get("result"), dict):
+                yield found["result"]
+                continue
+            found = cur.get("tweetResult")
+            if isinstance(found, dict) and isinstance(found.get("result"), dict):
+                yield found["result"]
+                continue
+            stack.extend(reversed(list(cur.values())))
+        elif isinstance(cur, list):
+            stack.extend(reversed(cur))
+
+
+def _unwrap_tweet(result: Dict) -> Optional[Dict]:
+    if result.get("__typename") == "TweetWithVisibilityResults":
+        result = result.get("tweet") or {}
+    if not result.get("rest_id") or not isinstance(result.get("legacy"), dict):
+        # Tombstones and unavailable tweets have no legacy body.
+        return None
+    return result
+
+
+def _user_fields(tweet: Dict) -> Dict[str, str]:
+    user = ((tweet.get("core") or {}).get("user_results") or {}).get("result") or {}
+    legacy = user.get("legacy") or {}
+    core = user.get("core") or {}
+    return {
+        "name": legacy.get("name") or core.get("name") or "",
+        "screen_name": legacy.get("screen_name") or core.get("screen_name") or "",
+    }
+
+
+def _iso_timestamp(created_at: str) -> str:
+    # Match the <time datetime> format rendered by the web client.
+    try:
+        dt = datetime.strptime(created_at, "%a %b %d %H:%M:%S %z %Y")
+    except (TypeError, ValueError):
+        return ""
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def _media_url(media_url_https: str) -> str:
+    # pbs.twimg.com/media/ID.jpg -> pbs.twimg.com/media/ID?format=jpg&name=orig (DOM capture form).
+    if not media_url_https or "?" in media_url_https:
+        return media_url_https or ""
+    base, dot, ext = media_url_https.rpartition(".")
+    if not dot or "/" in ext:
+        return media_url_https
+    return f"{base}?format={ext}&name=orig"
+
+
+def _tweet_text(tweet: Dict) -> str:
+    legacy = tweet["legacy"]
+    note = ((tweet.get("note_tweet") or {}).get("note_tweet_results") or {}).get("result") or {}
+    if note.get("text"):
+        text = note["text"]
+        url_entities = (note.get("entity_set") or {}).get("urls") or []
+    else:
+        text = legacy.get("full_text", "")
+        url_entities = (legacy.get("entities") or {}).get("urls") or []
+
+    for ent in url_entities:
+        short = ent.get("url", "")
+        expanded = ent.get("expanded_url", "")
+        if short and expanded:
+            text = text.replace(short, expanded)
+    # Trailing t.co links that only point at attached media.
+    for ent in (legacy.get("entities") or {}).get("media") or []:
+        short = ent.get("url", "")
+        if short:
+            text = text.replace(short, "")
+
+    parts = [_clean(line) for line in html.unescape(text).splitlines()]
+
+    # Long-form article body, when the payload carries it inline.
+    article = ((tweet.get("article") or {}).get("article_results") or {}).get("result") or {}
+    for block in (article.get("content_state") or {}).get("blocks") or []:
+        parts.append(_clean(block.get("text", "")))
+
+    out: List[str] = []
+    seen: Set[str] = set()
+    for part in parts:
+        if not part or part in seen:
+            continue
+        seen.add(part)
+        out.append(part)
+    return "\n".join(out).strip()
+
+
+def _tweet_media(tweet: Dict) -> List[str]:
+    legacy = tweet["legacy"]
+    media = (legacy.get("extended_entities") or {}).get("media") or (legacy.get("entities") or {}).get("media") or []
+    urls: List[str] = []
+    seen: Set[str] = set()
+    for m in media:
+        u = _media_url(m.get("media_url_https", ""))
+        if not u or u in seen:
+            continue
+        seen.add(u)
+        urls.append(u)
+    return urls
+
+
+def _tweet_article_urls(tweet: Dict) -> List[str]:
+    urls: List[str] = []
+    article = ((tweet.get("article") or {}).get("article_results") or {}).get("result") or {}
+    if article.get("rest_id"):
+        urls.append(f"https://x.com/i/article/{article['rest_id']}")
+    for ent in (tweet["legacy"].get("entities") or {}).get("urls") or []:
+        expanded = (ent.get("expanded_url") or "").split("?", 1)[0]
+        if "/article/" in expanded and expanded not in urls:
+            urls.append(expanded)
+    return urls
+
+
+def tweet_to_item(tweet: Dict) -> Dict:
+    """Convert one GraphQL tweet result into the capture item shape used by read_x_post."""
+    user = _user_fields(tweet)
+    handle = user["screen_name"]
+    sid = tweet["rest_id"]
+    author = _clean(f"{user['name']} @{handle}") if handle else _clean(user["name"])
+    return {
+        "status_id": sid,
+        "status_url": f"https://x.com/{handle}/status/{sid}" if handle else f"https://x.com/i/status/{sid}",
+        "author": author,
+        "author_handle": handle.lower(),
+        "timestamp": _iso_timestamp(tweet["legacy"].get("created_at", "")),
+        "text": _tweet_text(tweet),
+        "media_urls": _tweet_media(tweet),
+        "article_urls": _tweet_article_urls(tweet),
+    }
+
+
+def items_from_payloads(payloads: List[Dict]) -> List[Dict]:
+    """All distinct tweets across TweetDetail payloads, in conversation order."""
+    items: List[Dict] = []
+    seen: Set[str] = set()
+    for payload in payloads:
+        for raw in _iter_tweet_results(payload):
+            tweet = _unwrap_tweet(raw)
+            if tweet is None or tweet["rest_id"] in seen:
+                continue
+            seen.add(tweet["rest_id"])
+            items.append(tweet_to_item(tweet))
+    return items
@@ -3,10 +3,13 @@ from __future__ import annotations
 import re
 import subprocess
 from dataclasses import dataclass
+from html.parser import HTMLParser
 from typing import Dict, List, Optional
 
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+from metadata_cache import MetadataCache
 
 
 @dataclass
@@ -48,31 +51,140 @@ def _clean_text(text: str) -> str:
     return text
 
 
-def fetch_metadata(url: str, timeout: int = 12) -> Dict[str, str]:
-    headers = {
-        "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36",
-    }
+# Title and description live in <head>; stop reading there, or after this many bytes.
+HEAD_MAX_BYTES = 256 * 1024
+HEAD_END_RE = re.compile(rb"</head\s*>|<body[\s>]", re.IGNORECASE)
+META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset=["']?([A-Za-z0-9_-]+)""", re.IGNORECASE)
+DESCRIPTION_KEYS = ("description", "og:description", "twitter:description")
+
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36"
+
+
+class _HeadMetaParser(HTMLParser):
+    """Collects the first <title> and <meta name/property> contents until the head ends."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.title_parts: List[str] = []
+        self.by_name: Dict[str, str] = {}
+        self.by_property: Dict[str, str] = {}
+        self._in_title = False
+        self._title_done = False
+        self._done = False
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        if self._done:
+            return
+        if tag == "body":
+            self._done = True
+        elif tag == "title" and not self._title_done:
+            self._in_title = True
+        elif tag == "meta":
+            a = {k: v or "" for k, v in attrs}
+            if "name" in a:
+                self.by_name.setdefault(a["name"], a.get("content", ""))
+            if "property" in a:
+                self.by_property.setdefault(a["property"], a.get("content", ""))
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "title" and self._in_title:
+            self._in_title = False
+            self._title_done = True
+        elif tag == "head":
+            self._done = True
+
+    def handle_data(self, data: str) -> None:
+        if self._in_title:
+            self.title_parts.append(data)
+
+
+def _read_head(resp: requests.Response, max_bytes: int = HEAD_MAX_BYTES) -> str:
+    """Read the body incrementally up to the end of <head> and decode it."""
+    buf = bytearray()
+    for chunk in resp.iter_content(chunk_size=16 * 1024):
+        buf.extend(chunk)
+        if len(buf) >= max_bytes or HEAD_END_RE.search(buf):
+            break
+    raw = bytes(buf[:max_bytes])
+
+    encoding = ""
+    if "charset=" in resp.headers.get("Content-Type", "").lower():
+        encoding = resp.encoding or ""
+    if not encoding:
+        m = META_CHARSET_RE.search(raw)
+        encoding = m.group(1).decode("ascii") if m else "utf-8"
     try:
-        resp = requests.get(url, headers=headers, timeout=timeout)
-        resp.raise_for_status()
-    except Exception:
-        return {"title": "", "summary": ""}
+        return raw.decode(encoding, errors="replace")
+    except LookupError:
+        return raw.decode("utf-8", errors="replace")
+
 
-    soup = BeautifulSoup(resp.text, "html.parser")
-    title = soup.title.get_text(strip=True) if soup.title else ""
+def parse_head_metadata(html: str) -> Dict[str, str]:
+    parser = _HeadMetaParser()
+    parser.feed(html)
+    title = "".join(parser.title_parts)
 
     desc = ""
-    for meta_name in ("description", "og:description", "twitter:description"):
-        tag = soup.find("meta", attrs={"name": meta_name})
-        if not tag:
-            tag = soup.find("meta", attrs={"property": meta_name})
-        if tag and tag.get("content"):
-            desc = tag["content"]
+    for key in DESCRIPTION_KEYS:
+        content = parser.by_name.get(key)
+        if content is None:
+            content = parser.by_property.get(key)
+        if content:
+            desc = content
             break
-
     return {"title": _clean_text(title), "summary": _clean_text(desc)}
 
 
+def new_session(pool_size: int = 10) -> requests.Session:
+    """Keep-alive session for fetching many pages or files; safe to share across worker threads for GETs."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+def fetch_metadata(
+    url: str,
+    timeout: float = 12,
+    session: Optional[requests.Session] = None,
+    cache: Optional[MetadataCache] = None,
+) -> Dict[str, str]:
+    headers = {
+        "User-Agent": USER_AGENT,
+    }
+    cached = cache.get(url) if cache is not None else None
+    if cached is not None:
+        if cache.is_fresh(cached):
+            return {"title": cached["title"], "summary": cached["summary"]}
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    try:
+        # Streamed so only the <head> is downloaded; leaving the block drops the rest of the body.
+        with (session or requests).get(url, headers=headers, timeout=timeout, stream=True) as resp:
+            if resp.status_code == 304 and cached is not None:
+                cache.revalidated(url)
+                return {"title": cached["title"], "summary": cached["summary"]}
+            resp.raise_for_status()
+            head = _read_head(resp)
+            etag = resp.headers.get("ETag", "")
+            last_modified = resp.headers.get("Last-Modified", "")
+    except Exception:
+        # A stale cached value beats nothing when the site is down.
+        if cached is not None:
+            return {"title": cached["title"], "summary": cached["summary"]}
+        return {"title": "", "summary": ""}
+
+    meta = parse_head_metadata(head)
+    if cache is not None:
+        cache.put(url, meta["title"], meta["summary"], etag, last_modified)
+    return meta
+
+
 def infer_github_repo(url: str) -> str:
     match = re.match(r"https?://github.com/([^/]+/[^/]+)", url)
     if match:
@@ -80,7 +192,7 @@ def infer_github_repo(url: str) -> str:
     return ""
 
 
-def run_llm_command(command: str, prompt: str, timeout: int = 60) -> str:
+def run_llm_command(command: str, prompt: str, timeout: float = 60) -> str:
     try:
         result = subprocess.run(
             command,
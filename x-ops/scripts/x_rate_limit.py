@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator
+from urllib.parse import urlparse
+
+ROOT = Path(__file__).resolve().parents[1]
+STATE_PATH = ROOT / "data" / "x_rate_limit.json"
+LOCK_PATH = ROOT / "data" / "x_rate_limit.lock"
+
+# Shared by every process that talks to x.com (captures, the daemon, drafts). 0 disables pacing.
+RATE_PER_MIN = float(os.getenv("X_RATE_PER_MIN", "12") or 0)
+BURST = max(1.0, float(os.getenv("X_RATE_BURST", "4") or 1))
+BACKOFF_BASE_S = 30.0
+BACKOFF_MAX_S = 15 * 60.0
+
+X_HOSTS = {"x.com", "twitter.com", "api.x.com", "api.twitter.com"}
+THROTTLE_ARTICLE_STATUSES = {"login_required", "access_limited"}
+
+
+@contextmanager
+def _locked_state() -> Iterator[Dict]:
+    """Read-modify-write the bucket under an exclusive lock held across processes."""
+    LOCK_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with LOCK_PATH.open("a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            try:
+                state = json.loads(STATE_PATH.read_text(encoding="utf-8"))
+            except Exception:
+                state = {}
+            state.setdefault("tokens", BURST)
+            state.setdefault("updated_at", time.time())
+            state.setdefault("backoff_s", 0.0)
+            state.setdefault("blocked_until", 0.0)
+            yield state
+            tmp = STATE_PATH.with_suffix(".tmp")
+            tmp.write_text(json.dumps(state, indent=2) + "\n", encoding="utf-8")
+            tmp.replace(STATE_PATH)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _refill(state: Dict, now: float) -> None:
+    elapsed = max(0.0, now - state["updated_at"])
+    state["tokens"] = min(BURST, state["tokens"] + elapsed * RATE_PER_MIN / 60)
+    state["updated_at"] = now
+
+
+def acquire(cost: float = 1.0) -> float:
+    """Block until one more X page load is allowed; returns seconds waited."""
+    if RATE_PER_MIN <= 0:
+        return 0.0
+    waited = 0.0
+    while True:
+        with _locked_state() as state:
+            now = time.time()
+            _refill(state, now)
+            wait = state["blocked_until"] - now
+            if wait <= 0:
+                if state["tokens"] >= cost:
+                    state["tokens"] -= cost
+                    return waited
+                wait = (cost - state["tokens"]) * 60 / RATE_PER_MIN
+        time.sleep(wait)
+        waited += wait
+
+
+def throttled(reason: str) -> None:
+    """Record a throttling signal from X and pause everyone for the (doubling) backoff."""
+    if RATE_PER_MIN <= 0:
+        return
+    with _locked_state() as state:
+        now = time.time()
+        # One page often shows several signals (e.g. many 429 API calls); count them once per backoff window.
+        if now < state["blocked_until"]:
+            return
+        state["backoff_s"] = min(BACKOFF_MAX_S, max(BACKOFF_BASE_S, state["backoff_s"] * 2))
+        state["blocked_until"] = now + state["backoff_s"]
+        state["tokens"] = 0.0
+        state["updated_at"] = now
+        print(f"X throttling detected ({reason}); pausing X requests for {state['backoff_s']:.0f}s.")
+
+
+def succeeded() -> None:
+    """A clean page load halves the backoff, so pacing recovers once X stops throttling."""
+    if RATE_PER_MIN <= 0:
+        return
+    with _locked_state() as state:
+        if state["backoff_s"]:
+            state["backoff_s"] = state["backoff_s"] / 2 if state["backoff_s"] > BACKOFF_BASE_S else 0.0
+
+
+def _on_response(response) -> None:
+    if response.status != 429:
+        return
+    host = (urlparse(response.url).hostname or "").lower()
+    if host in X_HOSTS:
+        throttled("HTTP 429")
+
+
+def watch(context) -> None:
+    """Report HTTP 429 responses from X seen by any page of a Playwright context."""
+    context.on("response", _on_response)